@@ -1,3 +1,6 @@
+from itertools import islice
+
+
 class Item(object):
 
     def __init__(self, key, value):
@@ -7,32 +10,237 @@ class Item(object):
 
 class HashTable(object):
 
-    def __init__(self, size):
+    def __init__(self, size, max_load_factor=None, incremental_resize=False,
+                 buckets_per_step=8):
         self.size = size
-        self.table = [[] for _ in range(self.size)]
+        # Buckets are created on first use so allocating a table is cheap
+        self.table = [None] * self.size
+        self.count = 0
+        # Grow once count exceeds size * max_load_factor, or never if None
+        self.max_load_factor = max_load_factor
+        self.incremental_resize = incremental_resize
+        self.buckets_per_step = buckets_per_step
+        self.old_table = None  # Buckets still to migrate during a resize
+        self.old_size = 0
+        self.next_old_bucket = 0
+
+    @classmethod
+    def from_pairs(cls, pairs, max_load_factor=0.75, **kwargs):
+        """Build a growable table from an iterable of (key, value) pairs."""
+        table = cls(8, max_load_factor=max_load_factor, **kwargs)
+        table.set_many(pairs)
+        return table
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return self.keys()
 
     def _hash_function(self, key):
         return key % self.size
 
     def set(self, key, value):
+        self._step_resize(key)
         hash_index = self._hash_function(key)
-        for item in self.table[hash_index]:
+        bucket = self.table[hash_index]
+        if bucket is None:
+            bucket = self.table[hash_index] = []
+        for item in bucket:
             if item.key == key:
                 item.value = value
                 return
-        self.table[hash_index].append(Item(key, value))
+        bucket.append(Item(key, value))
+        self.count += 1
+        if self.max_load_factor is not None and \
+                self.count > self.size * self.max_load_factor:
+            self._start_resize()
 
     def get(self, key):
+        self._step_resize(key)
         hash_index = self._hash_function(key)
-        for item in self.table[hash_index]:
+        for item in self.table[hash_index] or ():
             if item.key == key:
                 return item.value
         raise KeyError('Key not found')
 
     def remove(self, key):
+        self._step_resize(key)
         hash_index = self._hash_function(key)
-        for index, item in enumerate(self.table[hash_index]):
+        for index, item in enumerate(self.table[hash_index] or ()):
             if item.key == key:
                 del self.table[hash_index][index]
+                self.count -= 1
                 return
-        raise KeyError('Key not found')
\ No newline at end of file
+        raise KeyError('Key not found')
+
+    def set_many(self, pairs, chunk_size=65536):
+        """Set every (key, value) pair, as if by set, with less overhead per pair.
+
+        Pairs are consumed in chunks.  Before each chunk a growable table is
+        resized once to fit it, so no resize happens mid-chunk, and the chunk
+        is then inserted in a tight loop without per-pair method calls.  A
+        sized collection of pairs is reserved for all at once up front.
+        """
+        if hasattr(pairs, '__len__'):
+            self._reserve(self.count + len(pairs))
+        pairs = iter(pairs)
+        while True:
+            chunk = list(islice(pairs, chunk_size))
+            if not chunk:
+                return
+            self._reserve(self.count + len(chunk))
+            table = self.table
+            size = self.size
+            added = 0
+            for key, value in chunk:
+                hash_index = key % size
+                bucket = table[hash_index]
+                if bucket is None:
+                    table[hash_index] = [Item(key, value)]
+                    added += 1
+                    continue
+                for item in bucket:
+                    if item.key == key:
+                        item.value = value
+                        break
+                else:
+                    bucket.append(Item(key, value))
+                    added += 1
+            self.count += added
+
+    def get_many(self, keys):
+        """Return the values for keys, in order.
+
+        Raises KeyError if any key is missing.  During an incremental resize
+        each key's old bucket is migrated first, as by get, and the call
+        advances the resize by one step overall.
+        """
+        if self.old_table is not None:
+            self._migrate_buckets(self.buckets_per_step)
+        table = self.table
+        size = self.size
+        values = []
+        for key in keys:
+            if self.old_table is not None:
+                self._migrate_bucket(key % self.old_size)
+            for item in table[key % size] or ():
+                if item.key == key:
+                    values.append(item.value)
+                    break
+            else:
+                raise KeyError('Key not found')
+        return values
+
+    def keys(self):
+        for item in self._snapshot_items():
+            yield item.key
+
+    def values(self):
+        for item in self._snapshot_items():
+            yield item.value
+
+    def items(self):
+        for item in self._snapshot_items():
+            yield item.key, item.value
+
+    def _snapshot_items(self):
+        """Yield every item over a snapshot of the bucket list.
+
+        Each bucket is copied when it is reached, so the table may be changed
+        or resized during iteration without raising, and every key present
+        for the whole iteration is yielded exactly once.
+
+        An incremental resize is not finished first.  The unmigrated old
+        buckets are walked, then the new ones, skipping items that were in
+        the old buckets when iteration began and have since migrated.
+        Old buckets are never changed once a resize starts, so they are a
+        faithful record of what was yielded from them.
+        """
+        old_table = None if self.old_table is None else list(self.old_table)
+        old_size = self.old_size
+        table = list(self.table)
+        if old_table is not None:
+            for bucket in old_table:
+                if bucket:
+                    yield from tuple(bucket)
+        for bucket in table:
+            if not bucket:
+                continue
+            for item in tuple(bucket):
+                if old_table is not None:
+                    old_bucket = old_table[item.key % old_size]
+                    if old_bucket and item in old_bucket:
+                        continue
+                yield item
+
+    def resize_progress(self):
+        """Return the fraction of old buckets swept, 1.0 if not resizing."""
+        if self.old_table is None:
+            return 1.0
+        return self.next_old_bucket / self.old_size
+
+    def _start_resize(self, size=None, incremental_resize=None):
+        """Grow to size buckets, by default double the current number.
+
+        In incremental mode the old buckets are kept alongside the new ones
+        and migrated a few at a time by later operations, otherwise they are
+        all migrated now.
+        """
+        if incremental_resize is None:
+            incremental_resize = self.incremental_resize
+        self._finish_resize()
+        self.old_table = self.table
+        self.old_size = self.size
+        self.next_old_bucket = 0
+        self.size = size or self.size * 2
+        self.table = [None] * self.size
+        if not incremental_resize:
+            self._finish_resize()
+
+    def _finish_resize(self):
+        if self.old_table is not None:
+            self._migrate_buckets(self.old_size)
+
+    def _reserve(self, count):
+        """Resize once, all at once, so count entries fit the load factor."""
+        self._finish_resize()
+        if self.max_load_factor is None:
+            return
+        size = self.size
+        while count > size * self.max_load_factor:
+            size *= 2
+        if size != self.size:
+            self._start_resize(size, incremental_resize=False)
+
+    def _step_resize(self, key):
+        """Migrate the old bucket for key, then a bounded number of others.
+
+        Migrating the key's own bucket first means every operation only has
+        to look in the new table.
+        """
+        if self.old_table is None:
+            return
+        self._migrate_bucket(key % self.old_size)
+        self._migrate_buckets(self.buckets_per_step)
+
+    def _migrate_buckets(self, num_buckets):
+        stop = min(self.next_old_bucket + num_buckets, self.old_size)
+        for old_index in range(self.next_old_bucket, stop):
+            self._migrate_bucket(old_index)
+        self.next_old_bucket = stop
+        if stop == self.old_size:
+            self.old_table = None
+
+    def _migrate_bucket(self, old_index):
+        bucket = self.old_table[old_index]
+        if bucket is None:
+            return
+        for item in bucket:
+            hash_index = self._hash_function(item.key)
+            new_bucket = self.table[hash_index]
+            if new_bucket is None:
+                self.table[hash_index] = [item]
+            else:
+                new_bucket.append(item)
+        self.old_table[old_index] = None
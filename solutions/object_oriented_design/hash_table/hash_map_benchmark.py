@@ -0,0 +1,78 @@
+"""Compare the chained HashTable with OpenAddressingHashTable, and the
+worst-case set latency of stop-the-world and incremental resizing.
+
+Run from the repository root:
+
+    python -m solutions.object_oriented_design.hash_table.hash_map_benchmark
+"""
+import gc
+import random
+import sys
+import time
+
+from .hash_map import HashTable
+from .open_addressing_hash_map import OpenAddressingHashTable
+
+
+def time_operations(table, keys):
+    # Look up and remove in a different order than inserted so neither table
+    # benefits from finding keys at the front of a chain or probe sequence
+    shuffled_keys = list(keys)
+    random.Random(1).shuffle(shuffled_keys)
+    timings = []
+    start = time.perf_counter()
+    for key in keys:
+        table.set(key, key)
+    timings.append(len(keys) / (time.perf_counter() - start))
+    for operation in (table.get, table.remove):
+        start = time.perf_counter()
+        for key in shuffled_keys:
+            operation(key)
+        timings.append(len(keys) / (time.perf_counter() - start))
+    return timings
+
+
+def time_resizes(num_keys, incremental_resize):
+    table = HashTable(8, max_load_factor=1.0, incremental_resize=incremental_resize)
+    latencies = []
+    resizing_sets = 0
+    # Keep garbage collector pauses out of the per-operation latencies
+    gc.disable()
+    start = time.perf_counter()
+    for key in range(num_keys):
+        operation_start = time.perf_counter()
+        table.set(key, key)
+        latencies.append(time.perf_counter() - operation_start)
+        if table.resize_progress() < 1.0:
+            resizing_sets += 1
+    total = time.perf_counter() - start
+    gc.enable()
+    latencies.sort()
+    return (num_keys / total, latencies[int(len(latencies) * 0.99)], latencies[-1],
+            resizing_sets)
+
+
+def main(num_keys=100000, num_buckets=1024):
+    keys = random.Random(0).sample(range(num_keys * 10), num_keys)
+    print('{} integer keys, chained table with {} buckets'.format(num_keys, num_buckets))
+    print('{:<26}{:>12}{:>12}{:>12}'.format('table', 'set/s', 'get/s', 'remove/s'))
+    tables = [
+        ('HashTable', HashTable(num_buckets)),
+        ('OpenAddressingHashTable', OpenAddressingHashTable()),
+    ]
+    for name, table in tables:
+        print('{:<26}{:>12.0f}{:>12.0f}{:>12.0f}'.format(
+            name, *time_operations(table, keys)))
+
+    print()
+    print('{} sets into a growing HashTable'.format(num_keys))
+    print('{:<16}{:>10}{:>14}{:>14}{:>16}'.format(
+        'resize', 'set/s', 'p99 us', 'max us', 'sets mid-resize'))
+    for name, incremental_resize in (('stop-the-world', False), ('incremental', True)):
+        rate, p99, worst, resizing_sets = time_resizes(num_keys, incremental_resize)
+        print('{:<16}{:>10.0f}{:>14.1f}{:>14.1f}{:>16}'.format(
+            name, rate, p99 * 1e6, worst * 1e6, resizing_sets))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,109 @@
+EMPTY = object()
+TOMBSTONE = object()
+
+
+class OpenAddressingHashTable(object):
+    """Linear probing hash table with the same API as hash_map.HashTable.
+
+    Keys, values and hashes live in parallel lists instead of per-item
+    objects, removed slots are marked with a tombstone so probe chains stay
+    intact, and the table doubles once live entries plus tombstones pass
+    max_load_factor.  Any hashable key is accepted.
+    """
+
+    def __init__(self, size=8, max_load_factor=0.7):
+        if not 0 < max_load_factor < 1:
+            raise ValueError('max_load_factor must be between 0 and 1')
+        capacity = 8
+        while capacity < size:
+            capacity <<= 1
+        self.max_load_factor = max_load_factor
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.keys = [EMPTY] * capacity
+        self.values = [None] * capacity
+        self.hashes = [0] * capacity
+        self.count = 0
+        self.tombstones = 0
+        self.max_used = int(capacity * self.max_load_factor)
+
+    def __len__(self):
+        return self.count
+
+    def _find_index(self, key, key_hash):
+        """Return the slot holding key, or -1 if key is not in the table."""
+        keys = self.keys
+        index = key_hash & self.mask
+        while True:
+            slot_key = keys[index]
+            if slot_key is EMPTY:
+                return -1
+            if slot_key is not TOMBSTONE and self.hashes[index] == key_hash and \
+                    (slot_key is key or slot_key == key):
+                return index
+            index = (index + 1) & self.mask
+
+    def set(self, key, value):
+        key_hash = hash(key)
+        keys = self.keys
+        index = key_hash & self.mask
+        first_tombstone = -1
+        while True:
+            slot_key = keys[index]
+            if slot_key is EMPTY:
+                break
+            if slot_key is TOMBSTONE:
+                if first_tombstone == -1:
+                    first_tombstone = index
+            elif self.hashes[index] == key_hash and (slot_key is key or slot_key == key):
+                self.values[index] = value
+                return
+            index = (index + 1) & self.mask
+        if first_tombstone != -1:
+            # Reuse the earliest tombstone on the probe path
+            index = first_tombstone
+            self.tombstones -= 1
+        keys[index] = key
+        self.values[index] = value
+        self.hashes[index] = key_hash
+        self.count += 1
+        if self.count + self.tombstones > self.max_used:
+            self._resize()
+
+    def get(self, key):
+        index = self._find_index(key, hash(key))
+        if index == -1:
+            raise KeyError('Key not found')
+        return self.values[index]
+
+    def remove(self, key):
+        index = self._find_index(key, hash(key))
+        if index == -1:
+            raise KeyError('Key not found')
+        self.keys[index] = TOMBSTONE
+        self.values[index] = None
+        self.count -= 1
+        self.tombstones += 1
+
+    def _resize(self):
+        """Rehash into a table twice as large, or the same size if the load
+        is mostly tombstones, reusing the stored hashes."""
+        old_keys, old_values, old_hashes = self.keys, self.values, self.hashes
+        capacity = self.capacity
+        if self.count * 2 > self.max_used:
+            capacity <<= 1
+        self._allocate(capacity)
+        keys, values, hashes, mask = self.keys, self.values, self.hashes, self.mask
+        for key, value, key_hash in zip(old_keys, old_values, old_hashes):
+            if key is EMPTY or key is TOMBSTONE:
+                continue
+            index = key_hash & mask
+            while keys[index] is not EMPTY:
+                index = (index + 1) & mask
+            keys[index] = key
+            values[index] = value
+            hashes[index] = key_hash
+            self.count += 1
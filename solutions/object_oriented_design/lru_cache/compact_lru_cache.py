@@ -0,0 +1,132 @@
+from array import array
+
+
+NIL = -1
+
+
+class CompactLinkedList(object):
+    """Doubly linked list over integer slots instead of Node objects.
+
+    The prev and next links of every slot live in two preallocated arrays,
+    so an entry costs two machine words rather than a full object.
+    """
+
+    def __init__(self, capacity):
+        self.prev = array('l', [NIL]) * capacity
+        self.next = array('l', [NIL]) * capacity
+        self.head = NIL
+        self.tail = NIL
+
+    def move_to_front(self, slot):
+        if slot == self.head:
+            return
+        self._detach(slot)
+        self.append_to_front(slot)
+
+    def append_to_front(self, slot):
+        self.prev[slot] = NIL
+        self.next[slot] = self.head
+        if self.head != NIL:
+            self.prev[self.head] = slot
+        self.head = slot
+        if self.tail == NIL:
+            self.tail = slot
+
+    def remove_from_tail(self):
+        if self.tail == NIL:
+            return None
+        old_tail = self.tail
+        self._detach(old_tail)
+        return old_tail
+
+    def _detach(self, slot):
+        prev_slot = self.prev[slot]
+        next_slot = self.next[slot]
+        if prev_slot != NIL:
+            self.next[prev_slot] = next_slot
+        if next_slot != NIL:
+            self.prev[next_slot] = prev_slot
+        if slot == self.tail:
+            self.tail = prev_slot
+        if slot == self.head:
+            self.head = next_slot
+        self.prev[slot] = NIL
+        self.next[slot] = NIL
+
+
+class CompactCache(object):
+    """LRU cache with the same API as lru_cache.Cache and compact storage.
+
+    Queries and results are kept in parallel lists indexed by slot, and the
+    lookup maps a query to its slot number.  Freed slots are chained through
+    the `next` array of the linked list and reused before untouched ones.
+    """
+
+    def __init__(self, max_size):
+        if max_size <= 0:
+            raise ValueError('max_size must be positive')
+        self.max_size = max_size
+        self.size = 0
+        self.lookup = {}  # key: query, value: slot
+        self.queries = [None] * max_size
+        self.results = [None] * max_size
+        self.linked_list = CompactLinkedList(max_size)
+        self.free_head = NIL
+        self.next_unused = 0
+
+    def _allocate_slot(self):
+        if self.free_head != NIL:
+            slot = self.free_head
+            self.free_head = self.linked_list.next[slot]
+            self.linked_list.next[slot] = NIL
+            return slot
+        slot = self.next_unused
+        self.next_unused += 1
+        return slot
+
+    def _release_slot(self, slot):
+        self.queries[slot] = None
+        self.results[slot] = None
+        self.linked_list.next[slot] = self.free_head
+        self.free_head = slot
+
+    def get(self, query):
+        """Get the stored query result from the cache.
+
+        Accessing a slot updates its position to the front of the LRU list.
+        """
+        slot = self.lookup.get(query)
+        if slot is None:
+            return None
+        self.linked_list.move_to_front(slot)
+        return self.results[slot]
+
+    def set(self, results, query):
+        """Set the result for the given query key in the cache.
+
+        When updating an entry, updates its position to the front of the LRU list.
+        If the entry is new and the cache is at capacity, the oldest entry's slot
+        is released to the free list and reused for the new entry.
+        """
+        slot = self.lookup.get(query)
+        if slot is not None:
+            # Key exists in cache, update the value
+            self.results[slot] = results
+            self.linked_list.move_to_front(slot)
+            return
+
+        # Key does not exist in cache
+        if self.size == self.max_size:
+            # Remove the oldest entry from the linked list and lookup
+            lru_slot = self.linked_list.remove_from_tail()
+            if lru_slot is not None:
+                self.lookup.pop(self.queries[lru_slot], None)
+                self._release_slot(lru_slot)
+        else:
+            self.size += 1
+        # Add the new key and value
+        slot = self._allocate_slot()
+        self.queries[slot] = query
+        self.results[slot] = results
+        self.linked_list.append_to_front(slot)
+        self.lookup[query] = slot
@@ -0,0 +1,142 @@
+import sys
+import time
+
+
+class EvictionPolicy(object):
+    """Hooks lru_cache.Cache calls as entries are read, added and removed.
+
+    Every hook defaults to a no-op so a policy only overrides what it needs.
+    Policies may store per-entry bookkeeping as attributes on the node.
+    """
+
+    def record_access(self, query):
+        """Called on every get, hit or miss."""
+        pass
+
+    def prepare(self, node):
+        """Called on a new node before the cache makes room for it."""
+        pass
+
+    def on_add(self, node):
+        pass
+
+    def on_remove(self, node):
+        pass
+
+    def is_expired(self, node):
+        return False
+
+    def can_fit(self, node):
+        """Return False if node would not fit even in an empty cache."""
+        return True
+
+    def needs_room(self, node, victims):
+        """Return True if node still doesn't fit once the victims, the oldest
+        entries chosen so far, are evicted."""
+        return False
+
+    def admit(self, node, victim):
+        """Return False to keep victim and drop the candidate node instead."""
+        return True
+
+
+class ByteBudgetPolicy(EvictionPolicy):
+    """Bound the cache by the total cost of its results rather than by count."""
+
+    def __init__(self, max_bytes, size_function=sys.getsizeof):
+        if max_bytes <= 0:
+            raise ValueError('max_bytes must be positive')
+        self.max_bytes = max_bytes
+        self.size_function = size_function
+        self.used_bytes = 0
+
+    def prepare(self, node):
+        node.cost = self.size_function(node.results)
+
+    def on_add(self, node):
+        self.used_bytes += node.cost
+
+    def on_remove(self, node):
+        self.used_bytes -= node.cost
+
+    def can_fit(self, node):
+        return node.cost <= self.max_bytes
+
+    def needs_room(self, node, victims):
+        freed = sum(victim.cost for victim in victims)
+        return self.used_bytes - freed + node.cost > self.max_bytes
+
+
+class TtlPolicy(EvictionPolicy):
+    """Expire entries lazily when they are read after their time to live.
+
+    ttl is either a number of seconds or a function of (query, results)
+    returning the seconds for that entry, or None for an entry that never
+    expires.
+    """
+
+    def __init__(self, ttl, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+
+    def prepare(self, node):
+        ttl = self.ttl(node.query, node.results) if callable(self.ttl) else self.ttl
+        node.expires_at = None if ttl is None else self.clock() + ttl
+
+    def is_expired(self, node):
+        return node.expires_at is not None and self.clock() >= node.expires_at
+
+
+class TinyLfuAdmissionPolicy(EvictionPolicy):
+    """Admit a new entry only if it is used more often than the one it evicts.
+
+    Access frequencies are estimated with a count-min sketch of small
+    saturating counters.  Once the number of recorded accesses reaches
+    sample_factor times the cache size every counter is halved, so the
+    estimate favors recent popularity.  This keeps one-off queries from a
+    scan out of the cache while hot queries stay resident.
+    """
+
+    MAX_COUNT = 15
+    HALVE = bytes(count >> 1 for count in range(256))
+
+    def __init__(self, max_size, depth=4, sample_factor=10):
+        width = 1
+        while width < max_size:
+            width <<= 1
+        self.mask = width - 1
+        self.rows = [bytearray(width) for _ in range(depth)]
+        self.sample_size = sample_factor * max_size
+        self.additions = 0
+
+    def _indexes(self, query):
+        # Double hashing over a mixed 64 bit hash gives one index per row
+        hashed = (hash(query) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        low = hashed & 0xFFFFFFFF
+        high = (hashed >> 32) | 1
+        return [(low + row * high) & self.mask for row in range(len(self.rows))]
+
+    def frequency(self, query):
+        return min(row[index]
+                   for row, index in zip(self.rows, self._indexes(query)))
+
+    def record_access(self, query):
+        indexes = self._indexes(query)
+        counts = [row[index] for row, index in zip(self.rows, indexes)]
+        minimum = min(counts)
+        if minimum < self.MAX_COUNT:
+            # Conservative update: only raise the counters at the minimum
+            for row, index, count in zip(self.rows, indexes, counts):
+                if count == minimum:
+                    row[index] = count + 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._reset()
+
+    def _reset(self):
+        for row in self.rows:
+            row[:] = row.translate(self.HALVE)
+        self.additions //= 2
+
+    def admit(self, node, victim):
+        return self.frequency(node.query) > self.frequency(victim.query)
@@ -1,3 +1,6 @@
+import threading
+
+
 class Node(object):
 
     def __init__(self, query, results):
@@ -28,6 +31,9 @@ class LinkedList(object):
         if self.tail is None:
             self.tail = node
 
+    def remove(self, node):
+        self._detach(node)
+
     def remove_from_tail(self):
         if self.tail is None:
             return None
@@ -50,25 +56,36 @@ class LinkedList(object):
 
 class Cache(object):
 
-    def __init__(self, max_size):
+    def __init__(self, max_size, policies=None):
         if max_size <= 0:
             raise ValueError('max_size must be positive')
         self.max_size = max_size
         self.size = 0
         self.lookup = {}  # key: query, value: node
         self.linked_list = LinkedList()
+        self.policies = list(policies or [])  # See eviction_policies
 
     def get(self, query):
         """Get the stored query result from the cache.
 
         Accessing a node updates its position to the front of the LRU list.
+        Entries a policy reports as expired are removed and treated as misses.
         """
         node = self.lookup.get(query)
+        for policy in self.policies:
+            policy.record_access(query)
         if node is None:
             return None
+        if self.policies and self._is_expired(node):
+            self._remove(node)
+            return None
         self.linked_list.move_to_front(node)
         return node.results
 
+    def get_many(self, queries):
+        """Get the stored results for each query, None for each miss."""
+        return [self.get(query) for query in queries]
+
     def set(self, results, query):
         """Set the result for the given query key in the cache.
 
@@ -76,6 +93,9 @@ class Cache(object):
         If the entry is new and the cache is at capacity, removes the oldest entry
         before the new entry is added.
         """
+        if self.policies:
+            self._set_with_policies(results, query)
+            return
         node = self.lookup.get(query)
         if node is not None:
             # Key exists in cache, update the value
@@ -95,3 +115,128 @@ class Cache(object):
         new_node = Node(query, results)
         self.linked_list.append_to_front(new_node)
         self.lookup[query] = new_node
+
+    def _set_with_policies(self, results, query):
+        """Set an entry, evicting from the tail until every policy has room.
+
+        Victims are picked from the tail first, and a new key may be rejected
+        by an admission policy in favor of any of them, in which case nothing
+        is evicted.  Updates to an existing key are always admitted, and an
+        entry that cannot fit even in an empty cache is not stored.
+        """
+        node = self.lookup.get(query)
+        if node is not None:
+            # Replace the entry so policies re-account its cost and expiry
+            self._remove(node)
+        new_node = Node(query, results)
+        for policy in self.policies:
+            policy.prepare(new_node)
+        if not all(policy.can_fit(new_node) for policy in self.policies):
+            return
+        victims = []
+        victim = self.linked_list.tail
+        while victim is not None and self._needs_room(new_node, victims):
+            victims.append(victim)
+            victim = victim.prev
+        if node is None and not all(self._admit(new_node, victim)
+                                    for victim in victims):
+            return
+        for victim in victims:
+            self._remove(victim)
+        self.linked_list.append_to_front(new_node)
+        self.lookup[query] = new_node
+        self.size += 1
+        for policy in self.policies:
+            policy.on_add(new_node)
+
+    def _remove(self, node):
+        self.linked_list.remove(node)
+        del self.lookup[node.query]
+        self.size -= 1
+        for policy in self.policies:
+            policy.on_remove(node)
+
+    def _is_expired(self, node):
+        return any(policy.is_expired(node) for policy in self.policies)
+
+    def _needs_room(self, node, victims):
+        if self.size - len(victims) >= self.max_size:
+            return True
+        return any(policy.needs_room(node, victims) for policy in self.policies)
+
+    def _admit(self, node, victim):
+        return all(policy.admit(node, victim) for policy in self.policies)
+
+
+class CacheShard(object):
+
+    def __init__(self, max_size):
+        self.cache = Cache(max_size)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+class ShardedCache(object):
+
+    def __init__(self, max_size, num_shards=16):
+        if num_shards <= 0:
+            raise ValueError('num_shards must be positive')
+        if max_size < num_shards:
+            raise ValueError('max_size must be at least num_shards')
+        self.num_shards = num_shards
+        shard_size, remainder = divmod(max_size, num_shards)
+        self.shards = [CacheShard(shard_size + (1 if index < remainder else 0))
+                       for index in range(num_shards)]
+
+    def _shard_for(self, query):
+        return self.shards[hash(query) % self.num_shards]
+
+    def get(self, query):
+        """Get the stored query result from the shard owning the query.
+
+        Only the owning shard is locked, so lookups of keys that hash to
+        different shards proceed in parallel.
+        """
+        shard = self._shard_for(query)
+        with shard.lock:
+            results = shard.cache.get(query)
+            if results is None:
+                shard.misses += 1
+            else:
+                shard.hits += 1
+        return results
+
+    def get_many(self, queries):
+        """Get the stored results for each query, None for each miss.
+
+        Queries are grouped by shard so each shard's lock is taken once.
+        """
+        indexes_by_shard = {}
+        for index, query in enumerate(queries):
+            shard = self._shard_for(query)
+            indexes_by_shard.setdefault(shard, []).append(index)
+        results = [None] * len(queries)
+        for shard, indexes in indexes_by_shard.items():
+            with shard.lock:
+                for index in indexes:
+                    results[index] = shard.cache.get(queries[index])
+                    if results[index] is None:
+                        shard.misses += 1
+                    else:
+                        shard.hits += 1
+        return results
+
+    def set(self, results, query):
+        """Set the result for the given query key in its owning shard."""
+        shard = self._shard_for(query)
+        with shard.lock:
+            shard.cache.set(results, query)
+
+    def stats(self):
+        """Return a list of (hits, misses) pairs, one per shard."""
+        stats = []
+        for shard in self.shards:
+            with shard.lock:
+                stats.append((shard.hits, shard.misses))
+        return stats
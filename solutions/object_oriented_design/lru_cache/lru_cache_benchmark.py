@@ -0,0 +1,45 @@
+"""Compare the memory footprint of Cache and CompactCache.
+
+Run from the repository root:
+
+    python -m solutions.object_oriented_design.lru_cache.lru_cache_benchmark
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from .compact_lru_cache import CompactCache
+from .lru_cache import Cache
+
+
+def measure(cache_class, num_entries):
+    # Build the keys up front and share one results object so only the
+    # per-entry overhead of the cache itself is traced
+    queries = ['query{}'.format(index) for index in range(num_entries)]
+    gc.collect()
+    tracked_before = len(gc.get_objects())
+    tracemalloc.start()
+    start = time.perf_counter()
+    cache = cache_class(num_entries)
+    for query in queries:
+        cache.set(None, query)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracked = len(gc.get_objects()) - tracked_before
+    return current, tracked, elapsed
+
+
+def main(num_entries=1000000):
+    print('{:<14}{:>12}{:>14}{:>14}{:>10}'.format(
+        'cache', 'total MiB', 'bytes/entry', 'gc objects', 'secs'))
+    for cache_class in (Cache, CompactCache):
+        current, tracked, elapsed = measure(cache_class, num_entries)
+        print('{:<14}{:>12.1f}{:>14.1f}{:>14}{:>10.2f}'.format(
+            cache_class.__name__, current / 2 ** 20,
+            current / num_entries, tracked, elapsed))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import heapq
+import json
+import math
+import struct
+import zlib
+
+import numpy as np
+
+
+def _key_bytes(key):
+    """Encode a key the same way in every process, tuples like lists, since
+    keys arriving through an mrjob shuffle have been through JSON."""
+    return json.dumps(key, separators=(',', ':')).encode('utf-8')
+
+
+def _hashable(key):
+    if isinstance(key, list):
+        return tuple(_hashable(part) for part in key)
+    return key
+
+
+class CountMinSketch(object):
+    """Approximate counts in fixed memory, never underestimating.
+
+    With width ceil(e / epsilon) and depth ceil(ln(1 / delta)), an estimate
+    exceeds the true count by more than epsilon times the total count with
+    probability at most delta.  Sketches of the same shape merge by adding
+    their tables, so mapper-side sketches can be combined in a reducer.
+    """
+
+    HEADER = struct.Struct('<II')
+
+    def __init__(self, epsilon=0.001, delta=0.01, width=None, depth=None):
+        self.width = width or int(math.ceil(math.e / epsilon))
+        self.depth = depth or int(math.ceil(math.log(1 / delta)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.rows = np.arange(self.depth, dtype=np.uint64)
+
+    def _indexes(self, keys):
+        """Return a depth x len(keys) array of column indexes.
+
+        Each key's 64 bit blake2b digest is split into two halves combined
+        by double hashing, one column per row.
+        """
+        digests = np.array(
+            [int.from_bytes(hashlib.blake2b(_key_bytes(key), digest_size=8).digest(),
+                            'little') for key in keys], dtype=np.uint64)
+        low = digests & np.uint64(0xFFFFFFFF)
+        high = (digests >> np.uint64(32)) | np.uint64(1)
+        return (low + self.rows[:, None] * high) % np.uint64(self.width)
+
+    def add(self, key, count=1):
+        self.add_many([key], [count])
+
+    def add_many(self, keys, counts=None):
+        """Add counts (default 1 each) for keys in one vectorized update."""
+        keys = list(keys)
+        if not keys:
+            return
+        counts = np.ones(len(keys), dtype=np.int64) if counts is None else \
+            np.asarray(counts, dtype=np.int64)
+        indexes = self._indexes(keys).astype(np.intp)
+        rows = np.arange(self.depth)[:, None]
+        np.add.at(self.table, (rows, indexes), counts)
+
+    def estimate(self, key):
+        return int(self.estimate_many([key])[0])
+
+    def estimate_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return np.zeros(0, dtype=np.int64)
+        indexes = self._indexes(keys).astype(np.intp)
+        rows = np.arange(self.depth)[:, None]
+        return self.table[rows, indexes].min(axis=0)
+
+    def merge(self, other):
+        if self.table.shape != other.table.shape:
+            raise ValueError('cannot merge sketches of different shapes')
+        self.table += other.table
+
+    def dumps(self):
+        """Return the sketch as a compressed, base64 encoded string."""
+        payload = self.HEADER.pack(self.width, self.depth) + self.table.tobytes()
+        return base64.b64encode(zlib.compress(payload)).decode('ascii')
+
+    @classmethod
+    def loads(cls, data):
+        payload = zlib.decompress(base64.b64decode(data))
+        width, depth = cls.HEADER.unpack_from(payload)
+        sketch = cls(width=width, depth=depth)
+        table = np.frombuffer(payload, dtype=np.int64, offset=cls.HEADER.size)
+        sketch.table = table.reshape(depth, width).copy()
+        return sketch
+
+
+class SpaceSaving(object):
+    """Track the heaviest keys of a stream in at most capacity counters.
+
+    When a new key arrives and every counter is taken, the smallest counter
+    is handed to it, and the count it inherits is recorded as that key's
+    maximum overestimate.  With capacity ceil(1 / epsilon) every key counted
+    more than epsilon times the stream total is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=None, epsilon=None):
+        if capacity is None:
+            if not epsilon:
+                raise ValueError('capacity or epsilon is required')
+            capacity = int(math.ceil(1 / epsilon))
+        self.capacity = capacity
+        self.counts = {}  # key: key, value: [count, error]
+        self.heap = []  # (count, key), with stale entries skipped lazily
+
+    def add(self, key, count=1):
+        entry = self.counts.get(key)
+        if entry is None:
+            error = 0
+            if len(self.counts) >= self.capacity:
+                error = self._evict_min()
+            entry = self.counts[key] = [error, error]
+        entry[0] += count
+        heapq.heappush(self.heap, (entry[0], key))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(entry[0], tracked_key)
+                         for tracked_key, entry in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def _evict_min(self):
+        while True:
+            count, key = heapq.heappop(self.heap)
+            entry = self.counts.get(key)
+            if entry is not None and entry[0] == count:
+                del self.counts[key]
+                return count
+
+    def min_count(self):
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.counts.values())
+
+    def top(self, k=None):
+        """Return (key, count, error) triples for the k heaviest keys.
+
+        The true count of each key lies between count - error and count.
+        """
+        items = heapq.nlargest(k or self.capacity, self.counts.items(),
+                               key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in items]
+
+    def merge(self, other):
+        """Merge another summary into this one.
+
+        A key missing from a full summary may have had up to its minimum
+        count there, so that minimum is added to both its count and error.
+        """
+        self_min = self.min_count()
+        other_min = other.min_count()
+        merged = {}
+        for key in set(self.counts) | set(other.counts):
+            count, error = self.counts.get(key, (self_min, self_min))
+            other_count, other_error = other.counts.get(key, (other_min, other_min))
+            merged[key] = [count + other_count, error + other_error]
+        capacity = max(self.capacity, other.capacity)
+        kept = heapq.nlargest(capacity, merged.items(), key=lambda item: item[1][0])
+        self.capacity = capacity
+        self.counts = dict(kept)
+        self.heap = [(entry[0], key) for key, entry in kept]
+        heapq.heapify(self.heap)
+
+    def dumps(self):
+        return json.dumps({
+            'capacity': self.capacity,
+            'counts': [[key, count, error] for key, (count, error) in self.counts.items()],
+        })
+
+    @classmethod
+    def loads(cls, data):
+        data = json.loads(data)
+        summary = cls(capacity=data['capacity'])
+        for key, count, error in data['counts']:
+            key = _hashable(key)
+            summary.counts[key] = [count, error]
+            summary.heap.append((count, key))
+        heapq.heapify(summary.heap)
+        return summary
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import inspect
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import zlib
+from itertools import groupby
+from operator import itemgetter
+
+
+_job = None  # The job being run, set in each worker process
+
+
+def _init_worker(job):
+    """Set the job for a worker process and make its FILES importable.
+
+    mrjob copies FILES, paths relative to the script declaring them, into
+    each task's working directory; here their directories go on sys.path.
+    """
+    global _job
+    _job = job
+    declaring_class = next((cls for cls in type(job).__mro__
+                            if 'FILES' in vars(cls)), None)
+    if declaring_class is None:
+        return
+    script_dir = os.path.dirname(os.path.abspath(inspect.getfile(declaring_class)))
+    for path in declaring_class.FILES:
+        file_dir = os.path.dirname(os.path.normpath(os.path.join(script_dir, path)))
+        if file_dir not in sys.path:
+            sys.path.append(file_dir)
+
+
+def _step_function(step, name):
+    """Return a step's mapper, combiner or reducer, or None.
+
+    Works for mrjob's MRStep, which is indexable by name, and plain dicts.
+    """
+    try:
+        return step[name]
+    except (KeyError, TypeError):
+        return getattr(step, name, None)
+
+
+def _encode(key, value):
+    return '{}\t{}\n'.format(json.dumps(key), json.dumps(value))
+
+
+def _read_split(path, start, end):
+    """Yield the lines starting inside [start, end) of path, without newlines.
+
+    Lines that aren't valid UTF-8 are decoded as latin-1.
+    """
+    with open(path, 'rb') as input_file:
+        if start:
+            # Skip to the first line starting at or after start, the line
+            # straddling start belongs to the previous split
+            input_file.seek(start - 1)
+            input_file.readline()
+        position = input_file.tell()
+        while position < end:
+            line = input_file.readline()
+            if not line:
+                break
+            position += len(line)
+            line = line.rstrip(b'\r\n')
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError:
+                # Like mrjob's TextValueProtocol, so one bad byte can't abort a run
+                yield line.decode('latin_1')
+
+
+def _map_inputs(split, first_step):
+    lines = _read_split(*split)
+    if first_step:
+        for line in lines:
+            yield None, line
+    else:
+        for line in lines:
+            key, value = line.split('\t', 1)
+            yield json.loads(key), json.loads(value)
+
+
+def _map_outputs(step, split, first_step):
+    """Yield the step's map output for one split, running its mapper_init
+    and mapper_final hooks around the split like mrjob does per task."""
+    mapper = _step_function(step, 'mapper')
+    mapper_init = _step_function(step, 'mapper_init')
+    mapper_final = _step_function(step, 'mapper_final')
+    if mapper_init:
+        mapper_init()
+    for key, value in _map_inputs(split, first_step):
+        if mapper is None:
+            yield key, value
+        else:
+            yield from mapper(key, value)
+    if mapper_final:
+        yield from mapper_final()
+
+
+class _Spiller(object):
+    """Buffer encoded map output per partition and spill sorted runs to disk."""
+
+    def __init__(self, task_dir, num_partitions, spill_records):
+        self.task_dir = task_dir
+        self.num_partitions = num_partitions
+        self.spill_records = spill_records
+        self.buffers = [[] for _ in range(num_partitions)]
+        self.buffered = 0
+        self.runs = [[] for _ in range(num_partitions)]
+
+    def add(self, encoded_key, value):
+        partition = zlib.crc32(encoded_key.encode('utf-8')) % self.num_partitions
+        self.buffers[partition].append((encoded_key, json.dumps(value)))
+        self.buffered += 1
+        if self.buffered >= self.spill_records:
+            self.spill()
+
+    def spill(self):
+        for partition, records in enumerate(self.buffers):
+            if not records:
+                continue
+            records.sort(key=itemgetter(0))
+            path = os.path.join(self.task_dir, 'p{}-r{}'.format(
+                partition, len(self.runs[partition])))
+            with open(path, 'w', encoding='utf-8') as run_file:
+                run_file.writelines('{}\t{}\n'.format(*record) for record in records)
+            self.runs[partition].append(path)
+            self.buffers[partition] = []
+        self.buffered = 0
+
+
+def _run_map_task(task):
+    """Run the step's mapper over one input split.
+
+    With a combiner, map output is aggregated in memory first: a key's
+    values are combined whenever combine_every of them build up, and all
+    keys are combined and spilled once combine_limit keys are held.
+    """
+    step_number, split, task_dir, num_partitions, spill_records, \
+        combine_every, combine_limit = task
+    step = _job.steps()[step_number]
+    combiner = _step_function(step, 'combiner')
+    os.makedirs(task_dir)
+    spiller = _Spiller(task_dir, num_partitions, spill_records)
+    pending = {}  # key: encoded key, value: values awaiting the combiner
+
+    def flush():
+        for encoded_key, values in pending.items():
+            for key, value in combiner(json.loads(encoded_key), values):
+                spiller.add(json.dumps(key), value)
+        pending.clear()
+
+    for out_key, out_value in _map_outputs(step, split, step_number == 0):
+        encoded_key = json.dumps(out_key)
+        if combiner is None:
+            spiller.add(encoded_key, out_value)
+            continue
+        values = pending.get(encoded_key)
+        if values is None:
+            pending[encoded_key] = [out_value]
+            if len(pending) >= combine_limit:
+                flush()
+        else:
+            values.append(out_value)
+            if len(values) >= combine_every:
+                # Combiners are expected to emit the key they were given
+                values[:] = [combined for _, combined in
+                             combiner(out_key, values)]
+    if combiner is not None:
+        flush()
+    spiller.spill()
+    return spiller.runs
+
+
+def _read_run(path):
+    with open(path, encoding='utf-8') as run_file:
+        for line in run_file:
+            encoded_key, encoded_value = line.rstrip('\n').split('\t', 1)
+            yield encoded_key, encoded_value
+
+
+def _run_key(line):
+    return line.split('\t', 1)[0]
+
+
+def _merge_runs(run_paths, max_fan_in):
+    """Merge sorted runs max_fan_in at a time until at most max_fan_in remain,
+    so no more than max_fan_in run files are ever open at once."""
+    while len(run_paths) > max_fan_in:
+        merged_paths = []
+        for start in range(0, len(run_paths), max_fan_in):
+            group = run_paths[start:start + max_fan_in]
+            fd, merged_path = tempfile.mkstemp(
+                prefix='merged-', dir=os.path.dirname(group[0]))
+            files = [open(path, encoding='utf-8') for path in group]
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as merged_file:
+                    merged_file.writelines(heapq.merge(*files, key=_run_key))
+            finally:
+                for run_file in files:
+                    run_file.close()
+            for path in group:
+                os.remove(path)
+            merged_paths.append(merged_path)
+        run_paths = merged_paths
+    return run_paths
+
+
+def _run_reduce_task(task):
+    """Merge one partition's sorted runs and stream each key to the reducer."""
+    step_number, run_paths, output_path, max_fan_in = task
+    run_paths = _merge_runs(run_paths, max_fan_in)
+    step = _job.steps()[step_number]
+    reducer = _step_function(step, 'reducer')
+    reducer_init = _step_function(step, 'reducer_init')
+    reducer_final = _step_function(step, 'reducer_final')
+    merged = heapq.merge(*(_read_run(path) for path in run_paths), key=itemgetter(0))
+    if reducer_init:
+        reducer_init()
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        for encoded_key, records in groupby(merged, key=itemgetter(0)):
+            key = json.loads(encoded_key)
+            values = (json.loads(encoded_value) for _, encoded_value in records)
+            if reducer is None:
+                outputs = ((key, value) for value in values)
+            else:
+                outputs = reducer(key, values)
+            for out_key, out_value in outputs:
+                output_file.write(_encode(out_key, out_value))
+        if reducer_final:
+            for out_key, out_value in reducer_final():
+                output_file.write(_encode(out_key, out_value))
+    return output_path
+
+
+class LocalMapReduceRunner(object):
+    """Run an mrjob job's steps() on one machine without Hadoop.
+
+    Each step maps input splits in a process pool, optionally combining map
+    output in memory, hash partitions it into sorted runs spilled to disk,
+    and has a pool of reducers merge each partition's runs, at most
+    max_fan_in files at a time, so no phase holds more than a bounded
+    number of records in memory or open files.  Keys and values
+    travel as JSON, as with mrjob's default protocols, so tuple keys reach
+    reducers as lists.
+
+    The job must be picklable, such as HitCounts(args=[]):
+
+        runner = LocalMapReduceRunner(HitCounts(args=[]))
+        for key, value in runner.run(['access.log']):
+            ...
+    """
+
+    def __init__(self, job, num_mappers=None, num_reducers=None,
+                 split_size=64 * 2 ** 20, spill_records=500000,
+                 combine_every=64, combine_limit=100000, max_fan_in=64,
+                 work_dir=None):
+        self.job = job
+        self.num_mappers = num_mappers or os.cpu_count() or 1
+        self.num_reducers = num_reducers or self.num_mappers
+        self.split_size = split_size
+        self.spill_records = spill_records
+        self.combine_every = combine_every
+        self.combine_limit = combine_limit
+        self.max_fan_in = max_fan_in
+        self.work_dir = work_dir
+
+    def _splits(self, paths):
+        for path in paths:
+            size = os.path.getsize(path)
+            for start in range(0, size, self.split_size):
+                yield path, start, min(start + self.split_size, size)
+
+    def run(self, input_paths):
+        """Run every step and yield the final (key, value) pairs."""
+        work_dir = tempfile.mkdtemp(prefix='local_mapreduce', dir=self.work_dir)
+        try:
+            paths = list(input_paths)
+            with multiprocessing.Pool(self.num_mappers, _init_worker,
+                                      (self.job,)) as pool:
+                for step_number in range(len(self.job.steps())):
+                    paths = self._run_step(pool, step_number, paths, work_dir)
+            for path in paths:
+                with open(path, encoding='utf-8') as output_file:
+                    for line in output_file:
+                        key, value = line.rstrip('\n').split('\t', 1)
+                        yield json.loads(key), json.loads(value)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run_step(self, pool, step_number, input_paths, work_dir):
+        step_dir = os.path.join(work_dir, 'step{}'.format(step_number))
+        map_tasks = [
+            (step_number, split, os.path.join(step_dir, 'map{}'.format(task_number)),
+             self.num_reducers, self.spill_records, self.combine_every,
+             self.combine_limit)
+            for task_number, split in enumerate(self._splits(input_paths))]
+        runs_by_partition = [[] for _ in range(self.num_reducers)]
+        for task_runs in pool.imap_unordered(_run_map_task, map_tasks):
+            for partition, runs in enumerate(task_runs):
+                runs_by_partition[partition].extend(runs)
+        reduce_tasks = [
+            (step_number, runs, os.path.join(step_dir, 'part-{:05d}'.format(partition)),
+             self.max_fan_in)
+            for partition, runs in enumerate(runs_by_partition)]
+        return pool.map(_run_reduce_task, reduce_tasks)
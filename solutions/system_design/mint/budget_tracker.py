@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+
+class BudgetTracker(object):
+    """Fire budget notifications as transactions arrive.
+
+    Keeps each user's running total per category for their current month,
+    next to the index of the next threshold to cross, so a transaction is
+    categorized, added and checked in constant time.  Every threshold fires
+    at most once per user, category and month, and totals start over when a
+    user's first transaction of a new month arrives.
+
+    notify is called as notify(user_id, period, category, threshold, total,
+    budget), e.g. with threshold 0.8 when 80% of the budget is spent.  Users
+    without a Budget are still totaled but never notified.
+    """
+
+    def __init__(self, categorizer, budgets, notify, thresholds=(0.8, 1.0)):
+        self.categorizer = categorizer
+        self.budgets = budgets  # key: user_id, value: Budget
+        self.notify = notify
+        self.thresholds = sorted(thresholds)
+        self.periods = {}  # key: user_id, value: current period
+        # key: user_id, value: {category: [total, next threshold index]}
+        self.totals = {}
+
+    def period_of(self, timestamp):
+        """Return the year and month, e.g. '2016-01', of a datetime or ISO string."""
+        if isinstance(timestamp, str):
+            return timestamp[:7]
+        return '{:04d}-{:02d}'.format(timestamp.year, timestamp.month)
+
+    def add_transaction(self, user_id, transaction):
+        """Count a transaction toward its category's monthly total.
+
+        Transactions from before the user's current month are ignored, since
+        that month's notifications have already been decided.
+        """
+        period = self.period_of(transaction.timestamp)
+        current_period = self.periods.get(user_id)
+        if current_period is None or period > current_period:
+            self.periods[user_id] = period
+            self.totals[user_id] = {}
+        elif period < current_period:
+            return
+        category = self.categorizer.categorize(transaction)
+        if category is None:
+            return
+        user_budget = self.budgets.get(user_id)
+        budget = None if user_budget is None else \
+            user_budget.categories_to_budget_map.get(category)
+        categories = self.totals[user_id]
+        state = categories.get(category)
+        if state is None:
+            state = categories[category] = [0, 0]
+        state[0] += transaction.amount
+        if budget is None:
+            return
+        while state[1] < len(self.thresholds) and \
+                state[0] >= budget * self.thresholds[state[1]]:
+            self.notify(user_id, period, category, self.thresholds[state[1]],
+                        state[0], budget)
+            state[1] += 1
+
+    def total(self, user_id, category):
+        """Return the user's spending in the category so far this month."""
+        state = self.totals.get(user_id, {}).get(category)
+        return state[0] if state else 0
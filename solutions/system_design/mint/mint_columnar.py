@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+import numpy as np
+
+BLANK_LINE_RE = re.compile(rb'^[ \t\r]*\n', re.MULTILINE)
+
+
+class ColumnarSpendingAggregator(object):
+    """Sum spending by (period, category) a chunk of transactions at a time.
+
+    A columnar alternative to SpendingByCategory for one machine.  Each chunk
+    of tab separated 'timestamp, seller, amount' lines is split into columns
+    with a couple of bytes operations, then categorized and summed with NumPy
+    so the interpreter only does work per distinct seller and period, not
+    per transaction.  Timestamps must start with an ISO year and month.
+    """
+
+    UNCATEGORIZED = None
+
+    def __init__(self, seller_category_map, chunk_size=64 * 2 ** 20):
+        self.seller_category_map = seller_category_map
+        self.chunk_size = chunk_size
+        self.categories = [self.UNCATEGORIZED]  # index: category code
+        self.category_codes = {self.UNCATEGORIZED: 0}
+        self.seller_ids = {}  # key: seller as bytes, value: seller id
+        self.seller_categories = np.zeros(0, dtype=np.int32)  # index: seller id
+        self.totals = {}  # key: (period, category), value: amount
+
+    def _category_code(self, seller):
+        category = self.seller_category_map.get(seller.decode('utf-8'),
+                                                self.UNCATEGORIZED)
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def _seller_ids_for(self, sellers):
+        """Return an array of seller ids, indexing sellers seen for the first time."""
+        ids = list(map(self.seller_ids.get, sellers))
+        if None in ids:
+            new_sellers = list(dict.fromkeys(
+                seller for seller, seller_id in zip(sellers, ids) if seller_id is None))
+            first_id = len(self.seller_ids)
+            for offset, seller in enumerate(new_sellers):
+                self.seller_ids[seller] = first_id + offset
+            self.seller_categories = np.concatenate([
+                self.seller_categories,
+                np.array([self._category_code(seller) for seller in new_sellers],
+                         dtype=np.int32)])
+            ids = list(map(self.seller_ids.get, sellers))
+        return np.array(ids, dtype=np.int64)
+
+    def _month_numbers(self, timestamps):
+        """Return year * 12 + month - 1 for each YYYY-MM timestamp prefix."""
+        digits = np.array(timestamps, dtype='S7').view(np.uint8).reshape(-1, 7)
+        digits = digits.astype(np.int64) - ord('0')
+        years = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+        return years * 12 + digits[:, 5] * 10 + digits[:, 6] - 1
+
+    def add_chunk(self, data):
+        """Aggregate a bytes chunk of complete transaction lines.
+
+        Blank lines are skipped.
+        """
+        data = BLANK_LINE_RE.sub(b'', data).rstrip()
+        fields = data.replace(b'\n', b'\t').split(b'\t')
+        if len(fields) < 3:
+            return
+        if len(fields) % 3:
+            raise ValueError('every line must have timestamp, seller and amount')
+        month_numbers = self._month_numbers(fields[0::3])
+        first_month = int(month_numbers.min())
+        # Look up ids first, it may extend seller_categories
+        seller_ids = self._seller_ids_for(fields[1::3])
+        category_codes = self.seller_categories[seller_ids]
+        amounts = np.array(fields[2::3]).astype(np.float64)
+        num_categories = len(self.categories)
+        group_keys = (month_numbers - first_month) * num_categories + category_codes
+        sums = np.bincount(group_keys, weights=amounts)
+        for group_key in np.flatnonzero(sums):
+            month_offset, category_code = divmod(int(group_key), num_categories)
+            year, month = divmod(first_month + month_offset, 12)
+            key = ('{:04d}-{:02d}'.format(year, month + 1), self.categories[category_code])
+            self.totals[key] = self.totals.get(key, 0.0) + float(sums[group_key])
+
+    def add_file(self, path):
+        """Aggregate a transaction file, reading it in chunk_size pieces."""
+        remainder = b''
+        with open(path, 'rb') as transactions:
+            while True:
+                data = transactions.read(self.chunk_size)
+                if not data:
+                    break
+                data = remainder + data
+                end = data.rfind(b'\n') + 1
+                remainder = data[end:]
+                self.add_chunk(data[:end])
+        self.add_chunk(remainder)
+
+    def spending(self, period=None):
+        """Return {(period, category): total}, optionally for one period."""
+        if period is None:
+            return dict(self.totals)
+        return {key: total for key, total in self.totals.items() if key[0] == period}
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from mrjob.job import MRJob
+from mrjob.step import MRStep
 
 
 class SpendingByCategory(MRJob):
@@ -33,9 +34,10 @@ class SpendingByCategory(MRJob):
         timestamp, seller, amount = line.split('\t')
         period = self. extract_year_month(timestamp)
         if period == self.current_year_month():
+            category = self.categorizer.categorize_seller(seller)
             yield (period, category), amount
 
-    def reducer(self, key, value):
+    def reducer(self, key, values):
         """Sum values for each key.
 
         (2016-01, shopping), 125
@@ -43,13 +45,13 @@ class SpendingByCategory(MRJob):
         """
         total = sum(values)
         self.handle_budget_notifications(key, total)
-        yield key, sum(values)
+        yield key, total
 
     def steps(self):
         """Run the map and reduce steps."""
         return [
-            self.mr(mapper=self.mapper,
-                    reducer=self.reducer)
+            MRStep(mapper=self.mapper,
+                   reducer=self.reducer)
         ]
 
 
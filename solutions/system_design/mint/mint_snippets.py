@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import functools
+from enum import Enum
+
+from .seller_matcher import OverrideCounter, SellerMatcher, normalize_seller
+
+
 class DefaultCategories(Enum):
 
     HOUSING = 0
@@ -15,19 +21,48 @@ seller_category_map['Target'] = DefaultCategories.SHOPPING
 
 class Categorizer(object):
 
-    def __init__(self, seller_category_map, seller_category_overrides_map):
+    def __init__(self, seller_category_map, seller_category_overrides_map=None,
+                 memo_size=65536):
         self.seller_category_map = seller_category_map
-        self.seller_category_overrides_map = seller_category_overrides_map
+        self.matcher = SellerMatcher(seller_category_map)
+        self.categorize_seller = functools.lru_cache(maxsize=memo_size)(
+            self._categorize_seller)
+        # key: normalized seller, value: OverrideCounter
+        self.seller_category_overrides_map = {}
+        for seller, categories in (seller_category_overrides_map or {}).items():
+            for category in categories:
+                self.add_override(seller, category)
 
     def categorize(self, transaction):
-        if transaction.seller in self.seller_category_map:
-            return self.seller_category_map[transaction.seller]
-        if transaction.seller in self.seller_category_overrides_map:
-            seller_category_map[transaction.seller] = \
-                self.manual_overrides[transaction.seller].peek_min()
-            return self.seller_category_map[transaction.seller]
+        return self.categorize_seller(transaction.seller)
+
+    def _categorize_seller(self, seller):
+        """Categorize a raw merchant string such as 'EXXON #1234 HOUSTON TX'.
+
+        Known sellers found in the normalized string win, then the category
+        users most often chose for this seller, otherwise None.
+        """
+        tokens = normalize_seller(seller)
+        category = self.matcher.match(tokens)
+        if category is not None:
+            return category
+        overrides = self.seller_category_overrides_map.get(tokens)
+        if overrides is not None:
+            return overrides.most_common()
         return None
 
+    def add_override(self, seller, category):
+        """Record a user recategorizing a seller's transaction."""
+        tokens = normalize_seller(seller)
+        overrides = self.seller_category_overrides_map.get(tokens)
+        if overrides is None:
+            overrides = self.seller_category_overrides_map[tokens] = OverrideCounter()
+        leader = overrides.most_common()
+        overrides.add(category)
+        if overrides.most_common() != leader:
+            # Memoized results may hold the previous leader
+            self.categorize_seller.cache_clear()
+
 
 class Transaction(object):
 
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import re
+from collections import deque
+
+
+TOKEN = re.compile(r"[^\W_]+(?:['&][^\W_]+)*")
+
+
+def normalize_seller(seller):
+    """Reduce a raw merchant string to a tuple of lower case name tokens.
+
+    Store numbers and other all digit tokens are dropped, so
+    'EXXON #1234 HOUSTON TX' becomes ('exxon', 'houston', 'tx').
+    """
+    return tuple(token for token in TOKEN.findall(seller.casefold())
+                 if not token.isdigit())
+
+
+class SellerMatcher(object):
+    """Aho-Corasick automaton over name tokens of known sellers.
+
+    Finds every known seller name inside a normalized merchant string in a
+    single pass, wherever it appears, so 'SQ *EXXON #1234 HOUSTON TX' still
+    matches 'Exxon'.  When several names match, the longest wins.
+    """
+
+    def __init__(self, seller_category_map):
+        self.transitions = [{}]  # index: state, value: {token: next state}
+        self.failures = [0]
+        self.outputs = [None]  # index: state, value: (num tokens, category)
+        for seller, category in seller_category_map.items():
+            self._insert(normalize_seller(seller), category)
+        self._link_failures()
+
+    def _insert(self, tokens, category):
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self.transitions[state].get(token)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions.append({})
+                self.failures.append(0)
+                self.outputs.append(None)
+                self.transitions[state][token] = next_state
+            state = next_state
+        self.outputs[state] = (len(tokens), category)
+
+    def _link_failures(self):
+        """Point each state at its longest proper suffix that is also a
+        prefix, inheriting that state's match if it has none of its own."""
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.transitions[state].items():
+                failure = self.failures[state]
+                while failure and token not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                failure = self.transitions[failure].get(token, 0)
+                if failure == next_state:
+                    failure = 0
+                self.failures[next_state] = failure
+                if self.outputs[next_state] is None:
+                    self.outputs[next_state] = self.outputs[failure]
+                queue.append(next_state)
+
+    def match(self, tokens):
+        """Return the category of the longest known seller in tokens, or None."""
+        state = 0
+        best = None
+        for token in tokens:
+            while state and token not in self.transitions[state]:
+                state = self.failures[state]
+            state = self.transitions[state].get(token, 0)
+            output = self.outputs[state]
+            if output is not None and (best is None or output[0] > best[0]):
+                best = output
+        return best[1] if best else None
+
+
+class OverrideCounter(object):
+    """Count users' category overrides for one seller.
+
+    Counts only grow, so the leading category is updated on each vote and
+    read back in O(1).
+    """
+
+    def __init__(self):
+        self.counts = {}  # key: category, value: number of overrides
+        self.leader = None
+
+    def add(self, category):
+        count = self.counts.get(category, 0) + 1
+        self.counts[category] = count
+        if self.leader is None or count > self.counts[self.leader]:
+            self.leader = category
+
+    def most_common(self):
+        return self.leader
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import sqlite3
+
+from .pastebin import HitCounts
+
+
+class HitCountRollups(object):
+    """Hit counts per (year-month, url) kept up to date incrementally.
+
+    Totals live in a SQLite rollup table next to a checkpoint of how many
+    bytes of each log file have been counted.  update() only reads what was
+    appended to each log since its checkpoint, and the new counts and the
+    advanced checkpoints are committed in one transaction, so a crash never
+    counts a segment twice.  Reads are answered from the rollup table.
+    """
+
+    def __init__(self, db_path, job=None):
+        self.job = job or HitCounts(args=[])
+        self.connection = sqlite3.connect(db_path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS hit_counts ('
+                'period TEXT, url TEXT, hits INTEGER NOT NULL, '
+                'PRIMARY KEY (period, url)) WITHOUT ROWID')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS checkpoints ('
+                'path TEXT PRIMARY KEY, offset INTEGER NOT NULL, '
+                'device INTEGER, inode INTEGER, first_line TEXT)')
+
+    def close(self):
+        self.connection.close()
+
+    def _checkpoint(self, path):
+        """Return the offset, device, inode and first line hash for path."""
+        row = self.connection.execute(
+            'SELECT offset, device, inode, first_line FROM checkpoints '
+            'WHERE path = ?', (path,)).fetchone()
+        return row or (0, None, None, None)
+
+    def _first_line_hash(self, path):
+        """Hash the first complete line, or return None if there isn't one."""
+        with open(path, 'rb') as log_file:
+            line = log_file.readline(4096)
+        if not line.endswith(b'\n'):
+            return None
+        return hashlib.blake2b(line, digest_size=16).hexdigest()
+
+    def _count_segment(self, path, offset, counts):
+        """Count complete lines from offset on and return the new offset.
+
+        A trailing line without a newline is still being written, so it is
+        left for the next update.
+        """
+        with open(path, 'rb') as log_file:
+            log_file.seek(offset)
+            for raw_line in log_file:
+                if not raw_line.endswith(b'\n'):
+                    break
+                offset += len(raw_line)
+                line = raw_line.decode('utf-8', 'replace')
+                url = self.job.extract_url(line)
+                period = self.job.extract_year_month(line)
+                if url is not None and period is not None:
+                    key = (period, url)
+                    counts[key] = counts.get(key, 0) + 1
+        return offset
+
+    def update(self, log_paths):
+        """Count the lines appended to each log since the last update.
+
+        A log is assumed to have been rotated, and is counted again from the
+        start, if it shrank, if the path now names a different file, or if
+        its first line changed, as after copytruncate even once the new log
+        has grown past the old offset.
+        """
+        counts = {}
+        checkpoints = []
+        for path in log_paths:
+            path = os.path.abspath(path)
+            offset, device, inode, first_line = self._checkpoint(path)
+            stat = os.stat(path)
+            current_first_line = self._first_line_hash(path)
+            if stat.st_size < offset or \
+                    (device is not None and
+                     (device, inode) != (stat.st_dev, stat.st_ino)) or \
+                    (first_line is not None and first_line != current_first_line):
+                offset = 0
+            offset = self._count_segment(path, offset, counts)
+            checkpoints.append((path, offset, stat.st_dev, stat.st_ino,
+                                current_first_line))
+        with self.connection:
+            self._add_counts(counts.items())
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO checkpoints '
+                '(path, offset, device, inode, first_line) VALUES (?, ?, ?, ?, ?)',
+                checkpoints)
+        return len(counts)
+
+    def add_counts(self, pairs):
+        """Merge ((period, url), hits) pairs, such as HitCounts output."""
+        with self.connection:
+            self._add_counts(pairs)
+
+    def _add_counts(self, pairs):
+        self.connection.executemany(
+            'INSERT INTO hit_counts (period, url, hits) VALUES (?, ?, ?) '
+            'ON CONFLICT (period, url) DO UPDATE SET hits = hits + excluded.hits',
+            ((period, url, hits) for (period, url), hits in pairs))
+
+    def get(self, period, url):
+        """Return the hits for url in the given year-month, e.g. '2016-01'."""
+        row = self.connection.execute(
+            'SELECT hits FROM hit_counts WHERE period = ? AND url = ?',
+            (period, url)).fetchone()
+        return row[0] if row else 0
+
+    def top_urls(self, period, k=10):
+        """Return the k most hit (url, hits) pairs for the year-month."""
+        return self.connection.execute(
+            'SELECT url, hits FROM hit_counts WHERE period = ? '
+            'ORDER BY hits DESC LIMIT ?', (period, k)).fetchall()
@@ -1,17 +1,75 @@
 # -*- coding: utf-8 -*-
 
 from mrjob.job import MRJob
+from mrjob.step import MRStep
+
+
+MONTHS = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+    'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12',
+}
 
 
 class HitCounts(MRJob):
+    """Count hits per url per month from web server access logs.
+
+    Log lines are in the common log format:
+
+    127.0.0.1 - - [10/Jan/2016:13:55:36 -0700] "GET /url0 HTTP/1.1" 200 2326
+    """
+
+    # Copied into each task's working directory, where --approximate imports it
+    FILES = ['../heavy_hitters.py']
+
+    def configure_args(self):
+        super(HitCounts, self).configure_args()
+        self.add_passthru_arg(
+            '--in-mapper-limit', type=int, default=10000,
+            help=('Distinct keys each mapper aggregates in memory before'
+                  ' emitting them, 0 to emit one pair per line'))
+        self.add_passthru_arg(
+            '--approximate', action='store_true',
+            help=('Count in fixed memory with sketches instead, reporting only'
+                  ' urls with more than --epsilon of all hits'))
+        self.add_passthru_arg(
+            '--epsilon', type=float, default=0.001,
+            help=('With --approximate, overestimate a count by at most this'
+                  ' fraction of the total hits'))
+        self.add_passthru_arg(
+            '--delta', type=float, default=0.01,
+            help=('With --approximate, the probability a count overestimates'
+                  ' by more than --epsilon'))
 
     def extract_url(self, line):
         """Extract the generated url from the log line."""
-        pass
+        start = line.find('"')
+        if start == -1:
+            return None
+        start = line.find(' /', start) + 2
+        if start == 1:
+            return None
+        # The path ends at the space before the protocol or the closing quote
+        end = line.find('"', start)
+        space = line.find(' ', start, end if end != -1 else len(line))
+        if space != -1:
+            end = space
+        url = line[start:end] if end != -1 else line[start:]
+        query_start = url.find('?')
+        return url[:query_start] if query_start != -1 else url
 
     def extract_year_month(self, line):
         """Return the year and month portions of the timestamp."""
-        pass
+        start = line.find('[')
+        if start == -1:
+            return None
+        # [dd/Mon/yyyy:hh:mm:ss zone]
+        month = MONTHS.get(line[start + 4:start + 7])
+        if month is None:
+            return None
+        return line[start + 8:start + 12] + '-' + month
+
+    def mapper_init(self):
+        self.counts = {}
 
     def mapper(self, _, line):
         """Parse each log line, extract and transform relevant lines.
@@ -21,12 +79,35 @@ class HitCounts(MRJob):
         (2016-01, url0), 1
         (2016-01, url0), 1
         (2016-01, url1), 1
+
+        With --in-mapper-limit set, counts are summed in memory instead and
+        emitted by mapper_final, or early once the limit is reached:
+
+        (2016-01, url0), 2
+        (2016-01, url1), 1
         """
         url = self.extract_url(line)
         period = self.extract_year_month(line)
-        yield (period, url), 1
+        if url is None or period is None:
+            return
+        if not self.options.in_mapper_limit:
+            yield (period, url), 1
+            return
+        key = (period, url)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if len(self.counts) >= self.options.in_mapper_limit:
+            yield from self.mapper_final()
+
+    def mapper_final(self):
+        counts = self.counts
+        self.counts = {}
+        yield from counts.items()
 
-    def reducer(self, key, value):
+    def combiner(self, key, values):
+        """Sum the values for each key emitted by one mapper."""
+        yield key, sum(values)
+
+    def reducer(self, key, values):
         """Sum values for each key.
 
         (2016-01, url0), 2
@@ -34,11 +115,77 @@ class HitCounts(MRJob):
         """
         yield key, sum(values)
 
+    def mapper_init_approximate(self):
+        from heavy_hitters import CountMinSketch, SpaceSaving
+        self.sketch = CountMinSketch(self.options.epsilon, self.options.delta)
+        self.heavy_hitters = SpaceSaving(epsilon=self.options.epsilon)
+        self.pending_keys = []  # Batched for vectorized sketch updates
+
+    def mapper_approximate(self, _, line):
+        """Add each line to this mapper's sketches, emitting nothing."""
+        url = self.extract_url(line)
+        period = self.extract_year_month(line)
+        if url is not None and period is not None:
+            key = (period, url)
+            self.heavy_hitters.add(key)
+            self.pending_keys.append(key)
+            if len(self.pending_keys) >= 10000:
+                self.sketch.add_many(self.pending_keys)
+                self.pending_keys = []
+        return ()
+
+    def mapper_final_approximate(self):
+        """Emit this mapper's serialized sketches under a single key."""
+        self.sketch.add_many(self.pending_keys)
+        self.pending_keys = []
+        yield None, (self.sketch.dumps(), self.heavy_hitters.dumps())
+
+    def reducer_approximate(self, _, values):
+        """Merge every mapper's sketches and emit the heavy hitters.
+
+        Only urls whose guaranteed Space-Saving count, count minus error,
+        exceeds --epsilon of all hits are emitted.  Each count is the smaller
+        of the Space-Saving and Count-Min estimates, both of which only
+        overestimate.
+
+        (2016-01, url0), 2
+        """
+        from heavy_hitters import CountMinSketch, SpaceSaving
+        sketch = None
+        heavy_hitters = None
+        for sketch_data, heavy_hitters_data in values:
+            mapper_sketch = CountMinSketch.loads(sketch_data)
+            mapper_heavy_hitters = SpaceSaving.loads(heavy_hitters_data)
+            if sketch is None:
+                sketch, heavy_hitters = mapper_sketch, mapper_heavy_hitters
+            else:
+                sketch.merge(mapper_sketch)
+                heavy_hitters.merge(mapper_heavy_hitters)
+        if sketch is None:
+            return
+        # Every hit lands in exactly one counter of each Count-Min row
+        threshold = self.options.epsilon * int(sketch.table[0].sum())
+        top = [(key, count) for key, count, error in heavy_hitters.top()
+               if count - error > threshold]
+        estimates = sketch.estimate_many(key for key, _ in top)
+        for (key, count), estimate in zip(top, estimates):
+            yield key, min(count, int(estimate))
+
     def steps(self):
-        """Run the map and reduce steps."""
+        """Run the map, combine and reduce steps."""
+        if self.options.approximate:
+            return [
+                MRStep(mapper_init=self.mapper_init_approximate,
+                       mapper=self.mapper_approximate,
+                       mapper_final=self.mapper_final_approximate,
+                       reducer=self.reducer_approximate)
+            ]
         return [
-            self.mr(mapper=self.mapper,
-                    reducer=self.reducer)
+            MRStep(mapper_init=self.mapper_init,
+                   mapper=self.mapper,
+                   mapper_final=self.mapper_final,
+                   combiner=self.combiner,
+                   reducer=self.reducer)
         ]
 
 
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Measure HitCounts shuffle volume with and without local aggregation.
+
+Generates a synthetic access log and reports the records and bytes each
+mapper would send through the shuffle, JSON encoded as with mrjob's
+default protocol.  Run from the repository root:
+
+    python -m solutions.system_design.pastebin.pastebin_benchmark
+"""
+import json
+import random
+import sys
+
+from .pastebin import MONTHS, HitCounts
+
+
+def make_log(num_lines, num_urls=10000, seed=0):
+    rng = random.Random(seed)
+    urls = ['{:07x}'.format(rng.getrandbits(28)) for _ in range(num_urls)]
+    months = list(MONTHS)[:3]
+    for _ in range(num_lines):
+        url = urls[min(int(rng.paretovariate(1.1)), num_urls) - 1]
+        yield ('10.0.0.{} - - [{:02d}/{}/2016:13:55:36 -0700] '
+               '"GET /{} HTTP/1.1" 200 2326'.format(
+                   rng.randrange(256), rng.randrange(1, 29),
+                   rng.choice(months), url))
+
+
+def map_split(job, lines):
+    job.mapper_init()
+    for line in lines:
+        yield from job.mapper(None, line)
+    yield from job.mapper_final()
+
+
+def combine(job, pairs):
+    grouped = {}
+    for key, value in pairs:
+        grouped.setdefault(key, []).append(value)
+    for key, values in grouped.items():
+        yield from job.combiner(key, values)
+
+
+def shuffle_size(pairs):
+    records = 0
+    num_bytes = 0
+    for key, value in pairs:
+        records += 1
+        num_bytes += len(json.dumps(key)) + len(json.dumps(value)) + 2
+    return records, num_bytes
+
+
+def main(num_lines=1000000, num_splits=4):
+    lines = list(make_log(num_lines))
+    split_size = -(-num_lines // num_splits)
+    splits = [lines[start:start + split_size]
+              for start in range(0, num_lines, split_size)]
+    modes = [
+        ('mapper only', 0, False),
+        ('combiner', 0, True),
+        ('in-mapper 10k', 10000, False),
+        ('in-mapper 10k + combiner', 10000, True),
+    ]
+    print('{} lines in {} splits'.format(num_lines, num_splits))
+    print('{:<28}{:>12}{:>16}'.format('mode', 'records', 'shuffle bytes'))
+    for name, limit, use_combiner in modes:
+        job = HitCounts(args=['--in-mapper-limit', str(limit)])
+        records = 0
+        num_bytes = 0
+        for split in splits:
+            pairs = map_split(job, split)
+            if use_combiner:
+                pairs = combine(job, pairs)
+            split_records, split_bytes = shuffle_size(pairs)
+            records += split_records
+            num_bytes += split_bytes
+        print('{:<28}{:>12}{:>16}'.format(name, records, num_bytes))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+
+class FakeReverseIndexCluster(object):
+    """In-process stand-in for the reverse index cluster.
+
+    Results are derived from the query alone, and every call sleeps for a
+    fixed round trip plus a per-query cost to mimic a remote search.
+    """
+
+    def __init__(self, round_trip_latency=0.005, per_query_latency=0.0005,
+                 results_per_query=10):
+        self.round_trip_latency = round_trip_latency
+        self.per_query_latency = per_query_latency
+        self.results_per_query = results_per_query
+        self.num_calls = 0
+
+    def _results(self, query):
+        seed = hash(query)
+        return ['doc{}'.format((seed + rank) % 1000003)
+                for rank in range(self.results_per_query)]
+
+    def process_search(self, query):
+        self.num_calls += 1
+        time.sleep(self.round_trip_latency + self.per_query_latency)
+        return self._results(query)
+
+    async def process_search_batch(self, queries):
+        self.num_calls += 1
+        await asyncio.sleep(self.round_trip_latency +
+                            self.per_query_latency * len(queries))
+        return [self._results(query) for query in queries]
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+
+from .reverse_index import ReverseIndex
+
+
+TRANSPORTS = ('pickle', 'shared_memory')
+RESULT = struct.Struct('dq')  # score, integer doc key
+
+
+def _search_shard(index, buffer, queries, k):
+    hits = [index.search_with_scores(query, k) for query in queries]
+    if buffer is None:
+        return hits
+    # Pack every hit list back to back, sending only the counts
+    offset = 0
+    for query_hits in hits:
+        for score, doc_key in query_hits:
+            RESULT.pack_into(buffer, offset, score, doc_key)
+            offset += RESULT.size
+    return [len(query_hits) for query_hits in hits]
+
+
+def _serve_shard(connection, transport, shared_memory_name):
+    """Own one ReverseIndex shard and answer requests from the parent.
+
+    Searches are answered with (error, result).  An exception is sent back
+    rather than ending the process, and one raised while adding documents,
+    which get no reply, is reported with the next search.
+    """
+    index = ReverseIndex()
+    buffer = None
+    if transport == 'shared_memory':
+        segment = shared_memory.SharedMemory(name=shared_memory_name)
+        buffer = segment.buf
+    add_error = None
+    while True:
+        command, payload, k = connection.recv()
+        if command == 'add':
+            try:
+                for doc_key, text in payload:
+                    index.add_document(doc_key, text)
+            except Exception as error:
+                add_error = add_error or error
+        elif command == 'search':
+            error, result = add_error, None
+            add_error = None
+            if error is None:
+                try:
+                    result = _search_shard(index, buffer, payload, k)
+                except Exception as search_error:
+                    error = search_error
+            connection.send((error, result))
+        elif command == 'close':
+            break
+    if buffer is not None:
+        buffer.release()
+        segment.close()
+    connection.close()
+
+
+class PartitionedReverseIndex(object):
+    """Reverse index sharded by document across worker processes.
+
+    Each query is scattered to every shard, each shard returns its local top
+    k with scores, and the parent merges them into the global top k.  Scores
+    use each shard's own document frequencies, the usual approximation for a
+    document-partitioned index.
+
+    With the 'pickle' transport hit lists are pickled over a pipe.  With the
+    'shared_memory' transport each shard writes packed (score, doc key) pairs
+    into its own shared memory segment and only the counts cross the pipe,
+    which requires integer doc keys and at most max_batch_size queries per
+    process_search_batch call, each asking for at most k results.
+    """
+
+    def __init__(self, num_shards, transport='pickle', k=10, max_batch_size=64):
+        if num_shards <= 0:
+            raise ValueError('num_shards must be positive')
+        if transport not in TRANSPORTS:
+            raise ValueError('transport must be one of {}'.format(TRANSPORTS))
+        self.num_shards = num_shards
+        self.transport = transport
+        self.k = k
+        self.max_batch_size = max_batch_size
+        self.connections = []
+        self.processes = []
+        self.segments = []
+        for _ in range(num_shards):
+            segment = None
+            if transport == 'shared_memory':
+                segment = shared_memory.SharedMemory(
+                    create=True, size=RESULT.size * k * max_batch_size)
+                self.segments.append(segment)
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve_shard, daemon=True,
+                args=(child_connection, transport, segment and segment.name))
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _shard_number(self, doc_key):
+        return hash(doc_key) % self.num_shards
+
+    def add_document(self, doc_key, text):
+        self.add_documents([(doc_key, text)])
+
+    def add_documents(self, documents):
+        """Index (doc key, text) pairs with one message per shard."""
+        batches = [[] for _ in range(self.num_shards)]
+        for doc_key, text in documents:
+            batches[self._shard_number(doc_key)].append((doc_key, text))
+        for connection, batch in zip(self.connections, batches):
+            if batch:
+                connection.send(('add', batch, None))
+
+    def _scatter_gather(self, queries, k):
+        if self.transport == 'shared_memory':
+            # Each shard's segment only has room for max_batch_size * self.k hits
+            if len(queries) > self.max_batch_size:
+                raise ValueError('at most {} queries per batch'.format(self.max_batch_size))
+            if k > self.k:
+                raise ValueError('at most k={} results per query'.format(self.k))
+        for connection in self.connections:
+            connection.send(('search', queries, k))
+        shard_hits = []
+        errors = []
+        # Receive every reply, even after an error, so the pipes stay in step
+        for shard_number, connection in enumerate(self.connections):
+            error, hits = connection.recv()
+            if error is not None:
+                errors.append(error)
+                continue
+            if self.transport == 'shared_memory':
+                hits = self._read_shared_hits(shard_number, hits)
+            shard_hits.append(hits)
+        if errors:
+            raise errors[0]
+        merged = []
+        for query_number in range(len(queries)):
+            candidates = [hit for hits in shard_hits for hit in hits[query_number]]
+            merged.append([doc_key for _, doc_key in heapq.nlargest(k, candidates)])
+        return merged
+
+    def _read_shared_hits(self, shard_number, counts):
+        buffer = self.segments[shard_number].buf
+        hits = []
+        offset = 0
+        for count in counts:
+            end = offset + count * RESULT.size
+            hits.append(list(RESULT.iter_unpack(buffer[offset:end])))
+            offset = end
+        return hits
+
+    def process_search(self, query, k=None):
+        """Return the keys of the global top k documents matching the query key."""
+        return self._scatter_gather([query], k or self.k)[0]
+
+    def search_many(self, queries, k=None):
+        """Search a batch of query keys in one round trip per shard."""
+        return self._scatter_gather(list(queries), k or self.k)
+
+    async def process_search_batch(self, queries):
+        return self.search_many(queries)
+
+    def close(self):
+        try:
+            for connection in self.connections:
+                try:
+                    connection.send(('close', None, None))
+                except OSError:
+                    pass  # The shard process already exited
+                connection.close()
+            for process in self.processes:
+                process.join()
+        finally:
+            for segment in self.segments:
+                segment.close()
+                segment.unlink()
+        self.connections = []
+        self.processes = []
+        self.segments = []
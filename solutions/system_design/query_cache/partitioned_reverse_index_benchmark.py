@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Measure how PartitionedReverseIndex throughput scales with shard count.
+
+Run from the repository root:
+
+    python -m solutions.system_design.query_cache.partitioned_reverse_index_benchmark
+"""
+import os
+import sys
+import time
+
+from .partitioned_reverse_index import TRANSPORTS, PartitionedReverseIndex
+from .query_parser import QueryParser
+from .reverse_index_benchmark import make_corpus, make_queries
+
+
+def main(num_docs=100000, num_queries=2000, batch_size=32, max_shards=None):
+    parser = QueryParser()
+    parsed_queries = [parser.parse(query) for query in make_queries(num_queries)]
+    batches = [parsed_queries[index:index + batch_size]
+               for index in range(0, num_queries, batch_size)]
+    shard_counts = [1]
+    while shard_counts[-1] * 2 <= (max_shards or os.cpu_count() or 1):
+        shard_counts.append(shard_counts[-1] * 2)
+    print('{:<15}{:>8}{:>16}{:>16}'.format(
+        'transport', 'shards', 'single q/s', 'batched q/s'))
+    for transport in TRANSPORTS:
+        for num_shards in shard_counts:
+            with PartitionedReverseIndex(num_shards, transport,
+                                         max_batch_size=batch_size) as index:
+                index.add_documents(make_corpus(num_docs))
+                # Wait for indexing to finish before timing searches
+                index.process_search(parsed_queries[0])
+                start = time.perf_counter()
+                for query in parsed_queries:
+                    index.process_search(query)
+                single_rate = num_queries / (time.perf_counter() - start)
+                start = time.perf_counter()
+                for batch in batches:
+                    index.search_many(batch)
+                batched_rate = num_queries / (time.perf_counter() - start)
+            print('{:<15}{:>8}{:>16.0f}{:>16.0f}'.format(
+                transport, num_shards, single_rate, batched_rate))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
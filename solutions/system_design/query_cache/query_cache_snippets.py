@@ -1,23 +1,53 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+
+from .query_parser import QueryParser
+from .single_flight import AsyncSingleFlight, SingleFlight
+
+
 class QueryApi(object):
 
-    def __init__(self, memory_cache, reverse_index_cluster):
+    def __init__(self, memory_cache, reverse_index_cluster, query_parser=None):
         self.memory_cache = memory_cache
         self.reverse_index_cluster = reverse_index_cluster
+        self.query_parser = query_parser or QueryParser()
+        self.single_flight = SingleFlight()
+        self.async_single_flight = AsyncSingleFlight()
 
     def parse_query(self, query):
         """Remove markup, break text into terms, deal with typos,
         normalize capitalization, convert to use boolean operations.
+
+        Returns the canonical query key, see QueryParser.  Repeated raw
+        queries are answered from the parser's memo table.
         """
-        ...
+        return self.query_parser.parse(query)
 
     def process_query(self, query):
         query = self.parse_query(query)
         results = self.memory_cache.get(query)
         if results is None:
-            results = self.reverse_index_cluster.process_search(query)
-            self.memory_cache.set(query, results)
+            # Concurrent misses for the same query share one backend search
+            results = self.single_flight.do(query, self._search, query)
+        return results
+
+    async def process_query_async(self, query):
+        """Process a query from a coroutine without blocking the event loop.
+
+        The backend search runs in a worker thread, and concurrent misses for
+        the same query on this loop share one search.
+        """
+        query = self.parse_query(query)
+        results = self.memory_cache.get(query)
+        if results is None:
+            results = await self.async_single_flight.do(
+                query, asyncio.to_thread, self._search, query)
+        return results
+
+    def _search(self, query):
+        results = self.reverse_index_cluster.process_search(query)
+        self.memory_cache.set(results, query)
         return results
 
 
@@ -26,6 +56,8 @@ class Node(object):
     def __init__(self, query, results):
         self.query = query
         self.results = results
+        self.prev = None
+        self.next = None
 
 
 class LinkedList(object):
@@ -40,26 +72,38 @@ class LinkedList(object):
     def append_to_front(self, node):
         ...
 
+    def remove(self, node):
+        ...
+
     def remove_from_tail(self):
         ...
 
 
 class Cache(object):
 
-    def __init__(self, MAX_SIZE):
+    def __init__(self, MAX_SIZE, policies=None):
         self.MAX_SIZE = MAX_SIZE
         self.size = 0
         self.lookup = {}
         self.linked_list = LinkedList()
+        # Optional byte budget, TTL and admission policies, see
+        # object_oriented_design/lru_cache/eviction_policies.py
+        self.policies = policies or []
 
-    def get(self, query)
+    def get(self, query):
         """Get the stored query result from the cache.
 
         Accessing a node updates its position to the front of the LRU list.
+        Expired entries are removed lazily here and reported as misses.
         """
-        node = self.lookup[query]
+        node = self.lookup.get(query)
+        for policy in self.policies:
+            policy.record_access(query)
         if node is None:
             return None
+        if any(policy.is_expired(node) for policy in self.policies):
+            self.remove(node)
+            return None
         self.linked_list.move_to_front(node)
         return node.results
 
@@ -67,23 +111,93 @@ class Cache(object):
         """Set the result for the given query key in the cache.
 
         When updating an entry, updates its position to the front of the LRU list.
-        If the entry is new and the cache is at capacity, removes the oldest entry
-        before the new entry is added.
+        If the entry is new and the cache is at capacity or over a policy's
+        budget, removes the oldest entries before the new entry is added, unless
+        an admission policy prefers to keep any of them, in which case nothing
+        is removed.
         """
-        node = self.map[query]
+        node = self.lookup.get(query)
         if node is not None:
-            # Key exists in cache, update the value
-            node.results = results
-            self.linked_list.move_to_front(node)
-        else:
-            # Key does not exist in cache
-            if self.size == self.MAX_SIZE:
-                # Remove the oldest entry from the linked list and lookup
-                self.lookup.pop(self.linked_list.tail.query, None)
-                self.linked_list.remove_from_tail()
-            else:
-                self.size += 1
-            # Add the new key and value
-            new_node = Node(query, results)
-            self.linked_list.append_to_front(new_node)
-            self.lookup[query] = new_node
+            # Key exists in cache, replace it so policies re-account its cost
+            self.remove(node)
+        new_node = Node(query, results)
+        for policy in self.policies:
+            policy.prepare(new_node)
+        if not all(policy.can_fit(new_node) for policy in self.policies):
+            return
+        # Pick the oldest entries to make room, then evict them only if
+        # the new entry is admitted over all of them
+        victims = []
+        victim = self.linked_list.tail
+        while victim is not None and self.needs_room(new_node, victims):
+            victims.append(victim)
+            victim = victim.prev
+        if node is None and not all(policy.admit(new_node, victim)
+                                    for victim in victims
+                                    for policy in self.policies):
+            return
+        for victim in victims:
+            self.remove(victim)
+        # Add the new key and value
+        self.linked_list.append_to_front(new_node)
+        self.lookup[query] = new_node
+        self.size += 1
+        for policy in self.policies:
+            policy.on_add(new_node)
+
+    def needs_room(self, node, victims):
+        if self.size - len(victims) >= self.MAX_SIZE:
+            return True
+        return any(policy.needs_room(node, victims) for policy in self.policies)
+
+    def remove(self, node):
+        self.linked_list.remove(node)
+        self.lookup.pop(node.query, None)
+        self.size -= 1
+        for policy in self.policies:
+            policy.on_remove(node)
+
+
+class AsyncQueryApi(QueryApi):
+    """Answer a page's worth of queries with as few backend round trips as possible.
+
+    The memory cache must support get_many and the reverse index cluster must
+    provide a coroutine process_search_batch(queries) returning one result
+    list per query, such as fake_reverse_index.FakeReverseIndexCluster.
+    """
+
+    def __init__(self, memory_cache, reverse_index_cluster, query_parser=None,
+                 batch_size=16, max_concurrency=4):
+        super(AsyncQueryApi, self).__init__(memory_cache, reverse_index_cluster,
+                                            query_parser)
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def process_queries(self, queries):
+        """Return the results for each query, in order.
+
+        All queries are checked against the memory cache in one multi-get.
+        The distinct misses are split into batches sent to the cluster
+        concurrently, with at most max_concurrency batches in flight.
+        """
+        parsed_queries = [self.parse_query(query) for query in queries]
+        cached = self.memory_cache.get_many(parsed_queries)
+        misses = list(dict.fromkeys(
+            query for query, results in zip(parsed_queries, cached)
+            if results is None))
+        found = {}
+        batches = [misses[index:index + self.batch_size]
+                   for index in range(0, len(misses), self.batch_size)]
+        for batch_results in await asyncio.gather(
+                *(self._search_batch(batch) for batch in batches)):
+            found.update(batch_results)
+        return [found[query] if results is None else results
+                for query, results in zip(parsed_queries, cached)]
+
+    async def _search_batch(self, queries):
+        async with self.semaphore:
+            batch_results = await self.reverse_index_cluster.process_search_batch(
+                queries)
+        for query, results in zip(queries, batch_results):
+            self.memory_cache.set(results, query)
+        return dict(zip(queries, batch_results))
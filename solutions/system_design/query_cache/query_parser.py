@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import re
+
+
+class QueryParser(object):
+    """Turn a raw query string into a canonical, hashable query key.
+
+    The key is a tuple of OR clauses, each a pair of sorted tuples holding the
+    terms that must and must not appear.  Terms within a clause are unordered
+    and deduplicated, so 'Cats dogs', 'dogs AND <b>cats</b>' and 'DOGS cats'
+    all map to the same key and share one cache entry.
+
+    Only the upper case words AND, OR and NOT are operators, AND binds tighter
+    than OR, and a leading '-' negates a term.  Parentheses are not supported.
+    """
+
+    MARKUP = re.compile(r'<[^>]*>|&(?:#\d+|#x[0-9a-f]+|[a-z]+\d*);', re.IGNORECASE)
+    TOKEN = re.compile(r'(?:(?<!\S)-)?\w+')
+
+    def __init__(self, corrections=None, memo_size=4096):
+        self.corrections = corrections or {}  # key: misspelling, value: term
+        self.parse = functools.lru_cache(maxsize=memo_size)(self._parse)
+
+    def _parse(self, query):
+        clauses = set()
+        required = set()
+        excluded = set()
+        negate_next = False
+        for token in self.TOKEN.findall(self.MARKUP.sub(' ', query)):
+            if token == 'OR':
+                if required or excluded:
+                    clauses.add(self._clause(required, excluded))
+                    required = set()
+                    excluded = set()
+                negate_next = False
+                continue
+            if token == 'AND':
+                continue
+            if token == 'NOT':
+                negate_next = True
+                continue
+            negated = negate_next
+            negate_next = False
+            if token[0] == '-':
+                negated = True
+                token = token[1:]
+            term = token.casefold()
+            term = self.corrections.get(term, term)
+            if negated:
+                excluded.add(term)
+            else:
+                required.add(term)
+        if required or excluded:
+            clauses.add(self._clause(required, excluded))
+        return tuple(sorted(clauses))
+
+    def _clause(self, required, excluded):
+        return tuple(sorted(required)), tuple(sorted(excluded))
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate
+
+
+class PostingList(object):
+    """Sorted doc ids for one term, delta-encoded in fixed size blocks.
+
+    Each block stores its first doc id in block_starts and the gaps between
+    the following doc ids in gaps, so a lookup only decodes the one block
+    that can hold the target.
+    """
+
+    BLOCK_SIZE = 128
+    MAX_TERM_FREQUENCY = 0xFFFF
+
+    def __init__(self):
+        self.block_starts = array('I')
+        self.gaps = array('I')  # 0 at the start of every block
+        self.term_frequencies = array('H')
+        self.last_doc_id = -1
+
+    def __len__(self):
+        return len(self.gaps)
+
+    def append(self, doc_id, term_frequency):
+        if doc_id <= self.last_doc_id:
+            raise ValueError('doc ids must be appended in increasing order')
+        if len(self.gaps) % self.BLOCK_SIZE == 0:
+            self.block_starts.append(doc_id)
+            self.gaps.append(0)
+        else:
+            self.gaps.append(doc_id - self.last_doc_id)
+        self.term_frequencies.append(min(term_frequency, self.MAX_TERM_FREQUENCY))
+        self.last_doc_id = doc_id
+
+    def block(self, block_number):
+        start = block_number * self.BLOCK_SIZE
+        return list(accumulate(self.gaps[start + 1:start + self.BLOCK_SIZE],
+                               initial=self.block_starts[block_number]))
+
+    def __iter__(self):
+        """Yield (doc_id, term_frequency) pairs in doc id order."""
+        term_frequencies = iter(self.term_frequencies)
+        for block_number in range(len(self.block_starts)):
+            for doc_id in self.block(block_number):
+                yield doc_id, next(term_frequencies)
+
+
+class PostingCursor(object):
+    """Forward-only search over a PostingList for ascending target doc ids."""
+
+    def __init__(self, posting_list):
+        self.posting_list = posting_list
+        self.block_number = 0
+        self.doc_ids = posting_list.block(0)
+        self.position = 0
+
+    def advance_to(self, target):
+        """Return the term frequency of target, or 0 if it is not listed.
+
+        Gallops over the block starts from the current block, then binary
+        searches the decoded block from the current position.
+        """
+        starts = self.posting_list.block_starts
+        low = self.block_number
+        bound = 1
+        while low + bound < len(starts) and starts[low + bound] <= target:
+            bound <<= 1
+        block_number = bisect_right(starts, target, low + bound // 2,
+                                    min(low + bound, len(starts))) - 1
+        if block_number < low:
+            return 0
+        if block_number != self.block_number:
+            self.block_number = block_number
+            self.doc_ids = self.posting_list.block(block_number)
+            self.position = 0
+        self.position = bisect_left(self.doc_ids, target, self.position)
+        if self.position < len(self.doc_ids) and self.doc_ids[self.position] == target:
+            index = block_number * PostingList.BLOCK_SIZE + self.position
+            return self.posting_list.term_frequencies[index]
+        return 0
+
+
+class ReverseIndex(object):
+    """In-process inverted index usable as QueryApi's reverse_index_cluster.
+
+    process_search takes the query key produced by QueryParser: a tuple of
+    OR clauses, each a pair of required and excluded term tuples.  Each
+    clause is answered by walking the shortest required posting list and
+    galloping through the others, the clauses are unioned, and the k best
+    documents by tf-idf are picked with a heap.
+    """
+
+    TOKEN = re.compile(r'\w+')
+
+    def __init__(self, k=10):
+        self.k = k
+        self.postings = {}  # key: term, value: PostingList
+        self.doc_keys = []  # index: internal doc id, value: caller's doc key
+
+    def add_document(self, doc_key, text):
+        doc_id = len(self.doc_keys)
+        self.doc_keys.append(doc_key)
+        for term, term_frequency in Counter(self.TOKEN.findall(text.casefold())).items():
+            posting_list = self.postings.get(term)
+            if posting_list is None:
+                posting_list = self.postings[term] = PostingList()
+            posting_list.append(doc_id, term_frequency)
+
+    def _idf(self, posting_list):
+        return math.log(1 + len(self.doc_keys) / len(posting_list))
+
+    def _match_clause(self, required, excluded):
+        """Return a dict of doc id to score for docs matching one clause."""
+        posting_lists = [self.postings.get(term) for term in required]
+        if not posting_lists or None in posting_lists:
+            return {}
+        posting_lists.sort(key=len)
+        lead = posting_lists[0]
+        lead_idf = self._idf(lead)
+        others = [(PostingCursor(posting_list), self._idf(posting_list))
+                  for posting_list in posting_lists[1:]]
+        exclusions = [PostingCursor(self.postings[term])
+                      for term in excluded if term in self.postings]
+        matches = {}
+        for doc_id, term_frequency in lead:
+            score = term_frequency * lead_idf
+            for cursor, idf in others:
+                term_frequency = cursor.advance_to(doc_id)
+                if not term_frequency:
+                    break
+                score += term_frequency * idf
+            else:
+                if not any(cursor.advance_to(doc_id) for cursor in exclusions):
+                    matches[doc_id] = score
+        return matches
+
+    def _union(self, clause_matches):
+        scores = {}
+        for matches in clause_matches:
+            for doc_id, score in matches.items():
+                if score > scores.get(doc_id, 0):
+                    scores[doc_id] = score
+        return scores
+
+    def search_with_scores(self, query, k=None):
+        """Return (score, doc key) pairs for the top k matches, best first."""
+        scores = self._union(self._match_clause(required, excluded)
+                             for required, excluded in query)
+        top = heapq.nlargest(k or self.k, scores, key=scores.__getitem__)
+        return [(scores[doc_id], self.doc_keys[doc_id]) for doc_id in top]
+
+    def process_search(self, query, k=None):
+        """Return the keys of the top k documents matching the query key."""
+        return [doc_key for _, doc_key in self.search_with_scores(query, k)]
+
+    async def process_search_batch(self, queries):
+        return [self.process_search(query) for query in queries]
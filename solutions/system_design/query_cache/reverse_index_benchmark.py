@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the in-process ReverseIndex on a synthetic Zipf corpus.
+
+Run from the repository root:
+
+    python -m solutions.system_design.query_cache.reverse_index_benchmark
+"""
+import random
+import sys
+import time
+from itertools import accumulate
+
+from .query_parser import QueryParser
+from .reverse_index import ReverseIndex
+
+
+def make_corpus(num_docs, vocabulary_size=50000, words_per_doc=100, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ['w{}'.format(rank) for rank in range(vocabulary_size)]
+    cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(vocabulary_size)))
+    for doc_key in range(num_docs):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_doc)
+        yield doc_key, ' '.join(words)
+
+
+def make_queries(num_queries, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(num_queries):
+        first, second = rng.randrange(1, 2000), rng.randrange(1, 2000)
+        template = rng.choice(['w{} w{}', 'w{} OR w{}', 'w{} -w{}'])
+        queries.append(template.format(first, second))
+    return queries
+
+
+def main(num_docs=100000, num_queries=2000):
+    index = ReverseIndex()
+    start = time.perf_counter()
+    for doc_key, text in make_corpus(num_docs):
+        index.add_document(doc_key, text)
+    build_seconds = time.perf_counter() - start
+    print('indexed {} docs, {} terms in {:.2f}s'.format(
+        num_docs, len(index.postings), build_seconds))
+
+    # Parse up front so only the index is measured
+    parser = QueryParser()
+    parsed_queries = [parser.parse(query) for query in make_queries(num_queries)]
+    latencies = []
+    for query in parsed_queries:
+        start = time.perf_counter()
+        index.process_search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print('{} queries: {:.0f} queries/s, p50 {:.2f}ms, p99 {:.2f}ms'.format(
+        num_queries, num_queries / sum(latencies),
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+
+
+class Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesce concurrent calls for the same key into a single call.
+
+    The first caller for a key runs the function while later callers for
+    that key block until it finishes and then share its results, or its
+    exception.  Once the call finishes the key is forgotten, so the next
+    caller starts a fresh call.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # key: key, value: in flight call
+
+    def do(self, key, function, *args):
+        with self.lock:
+            call = self.calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = Call()
+                self.calls[key] = call
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.results
+        try:
+            call.results = function(*args)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.results
+
+
+class AsyncSingleFlight(object):
+    """Coalesce concurrent coroutine calls for the same key on one event loop.
+
+    The shared call runs as a task, and each caller awaits it through
+    asyncio.shield so a cancelled caller does not cancel the others.
+    """
+
+    def __init__(self):
+        self.tasks = {}  # key: key, value: in flight task
+
+    async def do(self, key, coroutine_function, *args):
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coroutine_function(*args))
+            self.tasks[key] = task
+            task.add_done_callback(lambda _: self.tasks.pop(key, None))
+        return await asyncio.shield(task)
@@ -1,15 +1,35 @@
 # -*- coding: utf-8 -*-
 
+import heapq
+
 from mrjob.job import MRJob
+from mrjob.step import MRStep
 
 
 class SalesRanker(MRJob):
 
+    FILES = ['../heavy_hitters.py']  # SpaceSaving, for --approximate
+
+    def configure_args(self):
+        super(SalesRanker, self).configure_args()
+        self.add_passthru_arg(
+            '--top-k', type=int,
+            help=('Keep only the top k products per category, by default'
+                  ' all products are sorted'))
+        self.add_passthru_arg(
+            '--approximate', action='store_true',
+            help=('Rank with a fixed memory Space-Saving summary per'
+                  ' category instead'))
+        self.add_passthru_arg(
+            '--epsilon', type=float, default=0.001,
+            help=('With --approximate, overestimate quantities by at most'
+                  ' this fraction of the category total'))
+
     def within_past_week(self, timestamp):
         """Return True if timestamp is within past week, False otherwise."""
         ...
 
-    def mapper(self, _ line):
+    def mapper(self, _, line):
         """Parse each log line, extract and transform relevant lines.
 
         Emit key value pairs of the form:
@@ -23,9 +43,13 @@ class SalesRanker(MRJob):
         """
         timestamp, product_id, category, quantity = line.split('\t')
         if self.within_past_week(timestamp):
-            yield (category, product_id), quantity
+            yield (category, product_id), int(quantity)
+
+    def combiner(self, key, values):
+        """Sum the values for each key emitted by one mapper."""
+        yield key, sum(values)
 
-    def reducer(self, key, value):
+    def reducer(self, key, values):
         """Sum values for each key.
 
         (foo, p1), 2
@@ -60,18 +84,97 @@ class SalesRanker(MRJob):
         quantity = value
         yield (category, quantity), product_id
 
-    def reducer_identity(self, key, value):
-        yield key, value
+    def reducer_identity(self, key, values):
+        for product_id in values:
+            yield key, product_id
+
+    def mapper_top_k(self, key, value):
+        """Key each product's total by category alone.
+
+        (foo, p1), 2 -> foo, (2, p1)
+        """
+        category, product_id = key
+        yield category, (value, product_id)
+
+    def combiner_top_k(self, category, values):
+        """Forward only the mapper's k best products per category."""
+        for quantity_product in heapq.nlargest(self.options.top_k, values):
+            yield category, quantity_product
+
+    def reducer_top_k(self, category, values):
+        """Emit the k best products per category, best first.
+
+        A bounded heap replaces the global sort, so each category costs
+        O(n log k) and nothing beyond k products per category is shuffled
+        out of the combiners.
+
+        (bar, 10), p3
+        (bar, 3), p1
+        """
+        for quantity, product_id in heapq.nlargest(self.options.top_k, values):
+            yield (category, quantity), product_id
+
+    def mapper_init_approximate(self):
+        self.heavy_hitters = {}  # key: category, value: SpaceSaving
+
+    def mapper_approximate(self, _, line):
+        """Add each sale to its category's summary, emitting nothing."""
+        timestamp, product_id, category, quantity = line.split('\t')
+        if self.within_past_week(timestamp):
+            summary = self.heavy_hitters.get(category)
+            if summary is None:
+                from heavy_hitters import SpaceSaving
+                summary = self.heavy_hitters[category] = SpaceSaving(epsilon=self.options.epsilon)
+            summary.add(product_id, int(quantity))
+        return ()
+
+    def mapper_final_approximate(self):
+        for category, summary in self.heavy_hitters.items():
+            yield category, summary.dumps()
+
+    def reducer_approximate(self, category, values):
+        """Merge the category's summaries and emit its top products.
+
+        (bar, 10), p3
+        (bar, 3), p1
+        """
+        from heavy_hitters import SpaceSaving
+        merged = None
+        for data in values:
+            summary = SpaceSaving.loads(data)
+            if merged is None:
+                merged = summary
+            else:
+                merged.merge(summary)
+        for product_id, quantity, _ in merged.top(self.options.top_k):
+            yield (category, quantity), product_id
 
     def steps(self):
         """Run the map and reduce steps."""
+        if self.options.approximate:
+            return [
+                MRStep(mapper_init=self.mapper_init_approximate,
+                       mapper=self.mapper_approximate,
+                       mapper_final=self.mapper_final_approximate,
+                       reducer=self.reducer_approximate),
+            ]
+        if self.options.top_k:
+            return [
+                MRStep(mapper=self.mapper,
+                       combiner=self.combiner,
+                       reducer=self.reducer),
+                MRStep(mapper=self.mapper_top_k,
+                       combiner=self.combiner_top_k,
+                       reducer=self.reducer_top_k),
+            ]
         return [
-            self.mr(mapper=self.mapper,
-                    reducer=self.reducer),
-            self.mr(mapper=self.mapper_sort,
-                    reducer=self.reducer_identity),
+            MRStep(mapper=self.mapper,
+                   combiner=self.combiner,
+                   reducer=self.reducer),
+            MRStep(mapper=self.mapper_sort,
+                   reducer=self.reducer_identity),
         ]
 
 
 if __name__ == '__main__':
-    HitCounts.run()
+    SalesRanker.run()
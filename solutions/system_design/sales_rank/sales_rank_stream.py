@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import date
+
+
+class SlidingWindowSalesRank(object):
+    """Per-category top k products over the past window_days, kept in memory.
+
+    Sales are counted into one bucket per day as they arrive.  When the
+    window slides the expired day's bucket is subtracted from the running
+    totals, and only the categories it touched rebuild their top k.  Between
+    slides each sale updates its category's top k, a sorted list of at most
+    k (-quantity, product) entries.  The position is found by binary search
+    but the insert and delete shift up to k entries, so an update is O(k),
+    a single memmove that beats a tree or heap for the small k ranked.
+    """
+
+    def __init__(self, k=10, window_days=7):
+        if k <= 0 or window_days <= 0:
+            raise ValueError('k and window_days must be positive')
+        self.k = k
+        self.window_days = window_days
+        self.current_day = None  # Ordinal of the newest day in the window
+        self.days = deque()  # (day ordinal, {(category, product_id): quantity})
+        self.totals = {}  # key: category, value: {product_id: quantity}
+        self.top = {}  # key: category, value: sorted [(-quantity, product_id)]
+        self.top_quantities = {}  # key: category, value: {product_id: quantity}
+
+    def add_sale(self, day, category, product_id, quantity):
+        """Count a sale made on day, a datetime.date, sliding the window if
+        day is newer than any seen so far.  Sales older than the window are
+        ignored."""
+        ordinal = day.toordinal()
+        if self.current_day is None or ordinal > self.current_day:
+            self.advance_to(day)
+        elif ordinal <= self.current_day - self.window_days:
+            return
+        bucket = self._bucket(ordinal)
+        key = (category, product_id)
+        bucket[key] = bucket.get(key, 0) + quantity
+        products = self.totals.setdefault(category, {})
+        total = products.get(product_id, 0) + quantity
+        products[product_id] = total
+        self._update_top(category, product_id, total)
+
+    def add_sale_line(self, line):
+        """Count a sales log line: timestamp, product_id, category, quantity.
+
+        The timestamp must start with an ISO date such as 2016-01-01.
+        """
+        timestamp, product_id, category, quantity = line.rstrip('\n').split('\t')
+        self.add_sale(date.fromisoformat(timestamp[:10]), category, product_id,
+                      int(quantity))
+
+    def advance_to(self, day):
+        """Slide the window so day is its newest day, expiring older buckets."""
+        ordinal = day.toordinal()
+        if self.current_day is not None and ordinal <= self.current_day:
+            return
+        self.current_day = ordinal
+        touched = set()
+        while self.days and self.days[0][0] <= ordinal - self.window_days:
+            _, bucket = self.days.popleft()
+            for (category, product_id), quantity in bucket.items():
+                products = self.totals[category]
+                remaining = products[product_id] - quantity
+                if remaining:
+                    products[product_id] = remaining
+                else:
+                    del products[product_id]
+                touched.add(category)
+        for category in touched:
+            self._rebuild_top(category)
+
+    def _bucket(self, ordinal):
+        for day_ordinal, bucket in reversed(self.days):
+            if day_ordinal == ordinal:
+                return bucket
+            if day_ordinal < ordinal:
+                break
+        bucket = {}
+        self.days.append((ordinal, bucket))
+        # Late sales within the window may add a bucket out of order
+        if len(self.days) > 1 and self.days[-2][0] > ordinal:
+            self.days = deque(sorted(self.days, key=lambda day: day[0]))
+        return bucket
+
+    def _update_top(self, category, product_id, total):
+        """Reflect an increased total in the category's top k in O(k)."""
+        top = self.top.setdefault(category, [])
+        quantities = self.top_quantities.setdefault(category, {})
+        old_total = quantities.get(product_id)
+        if old_total is not None:
+            del top[bisect_left(top, (-old_total, product_id))]
+        elif len(top) == self.k and (-total, product_id) >= top[-1]:
+            return
+        insort(top, (-total, product_id))
+        quantities[product_id] = total
+        if len(top) > self.k:
+            _, evicted = top.pop()
+            del quantities[evicted]
+
+    def _rebuild_top(self, category):
+        products = self.totals[category]
+        best = heapq.nsmallest(self.k, ((-quantity, product_id)
+                                        for product_id, quantity in products.items()))
+        self.top[category] = best
+        self.top_quantities[category] = {product_id: -negative_quantity
+                                          for negative_quantity, product_id in best}
+        if not products:
+            del self.totals[category]
+
+    def top_k(self, category):
+        """Return up to k (product_id, quantity) pairs, best first."""
+        return [(product_id, -negative_quantity)
+                for negative_quantity, product_id in self.top.get(category, [])]
+
+    def rank(self, category, product_id):
+        """Return the 1-based rank of a product in its category's top k,
+        or None if it is not in the top k."""
+        quantity = self.top_quantities.get(category, {}).get(product_id)
+        if quantity is None:
+            return None
+        return bisect_left(self.top[category], (-quantity, product_id)) + 1
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import heapq
+import inspect
+import itertools
+from collections import deque
+from urllib.parse import urlsplit
+
+
+class InMemoryFetcher(object):
+    """Fetcher serving pages from a dict of url to Page, for local runs.
+
+    Each fetch sleeps for latency seconds to stand in for the network.
+    Fetchers only need an async fetch(url) returning a Page, or None if
+    the url could not be fetched.
+    """
+
+    def __init__(self, pages, latency=0.0):
+        self.pages = pages
+        self.latency = latency
+        self.num_fetches = 0
+
+    async def fetch(self, url):
+        self.num_fetches += 1
+        await asyncio.sleep(self.latency)
+        return self.pages.get(url)
+
+
+class AsyncCrawler(object):
+    """Crawl with many concurrent fetches while staying polite to each host.
+
+    Links pulled from the data store are queued per host.  Hosts with work
+    wait in a heap ordered by the time they may next be fetched from, and
+    max_concurrency workers take the earliest ready host, fetch one of its
+    urls, then schedule the host again per_host_delay seconds later, so no
+    host sees more than one request at a time from this crawler.
+
+    Crawled pages pass to the reverse index and document index queues
+    through bounded buffers.  When an index falls behind its buffer fills
+    and workers wait before crawling further.
+
+    A url whose fetch raises is handled like one that returned no page and
+    counted in fetch_errors; pages an index queue fails on are counted in
+    index_errors.
+    """
+
+    def __init__(self, data_store, fetcher, reverse_index_queue, doc_index_queue,
+                 max_concurrency=64, per_host_delay=1.0, frontier_buffer_size=1000,
+                 index_buffer_size=1000, seen_urls=None):
+        self.data_store = data_store
+        self.fetcher = fetcher
+        self.reverse_index_queue = reverse_index_queue
+        self.doc_index_queue = doc_index_queue
+        self.max_concurrency = max_concurrency
+        self.per_host_delay = per_host_delay
+        self.frontier_buffer_size = frontier_buffer_size
+        self.index_buffer_size = index_buffer_size
+        self.seen_urls = seen_urls
+        self.pages_crawled = 0
+        self.fetch_errors = 0
+        self.index_errors = 0
+
+    async def crawl(self, max_pages=None):
+        """Crawl until the data store has no links left or max_pages pages
+        have been fetched, and return the number of pages fetched."""
+        self.max_pages = max_pages
+        self.pages_crawled = 0
+        self.fetch_errors = 0
+        self.index_errors = 0
+        self.host_queues = {}  # key: host, value: deque of urls
+        self.ready_hosts = []  # heap of (time the host may be fetched, seq, host)
+        self.scheduled_hosts = set()  # hosts in ready_hosts or being fetched
+        self.next_fetch_times = {}  # key: host, value: earliest next fetch
+        self.buffered = 0
+        self.in_flight = 0
+        self.sequence = itertools.count()
+        self.condition = asyncio.Condition()
+        index_buffers = [
+            (asyncio.Queue(self.index_buffer_size), self.reverse_index_queue),
+            (asyncio.Queue(self.index_buffer_size), self.doc_index_queue),
+        ]
+        self.index_buffers = [buffer for buffer, _ in index_buffers]
+        pumps = [asyncio.create_task(self._pump(buffer, index_queue))
+                 for buffer, index_queue in index_buffers]
+        workers = [asyncio.create_task(self._worker())
+                   for _ in range(self.max_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # On failure stop the other workers, then drain what was crawled
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for buffer in self.index_buffers:
+                await buffer.put(None)
+            await asyncio.gather(*pumps)
+        return self.pages_crawled
+
+    def _refill(self):
+        """Move links from the data store into the per-host queues."""
+        loop_time = asyncio.get_running_loop().time()
+        while self.buffered < self.frontier_buffer_size:
+            if self.max_pages is not None and \
+                    self.pages_crawled + self.in_flight + self.buffered >= self.max_pages:
+                return
+            link = self.data_store.extract_max_priority_page()
+            if link is None:
+                return
+            url = getattr(link, 'url', link)
+            host = urlsplit(url).netloc
+            self.host_queues.setdefault(host, deque()).append(url)
+            self.buffered += 1
+            if host not in self.scheduled_hosts:
+                self._schedule(host, max(loop_time, self.next_fetch_times.get(host, 0)))
+
+    def _schedule(self, host, ready_time):
+        self.scheduled_hosts.add(host)
+        heapq.heappush(self.ready_hosts, (ready_time, next(self.sequence), host))
+
+    async def _next_url(self):
+        """Wait for a url whose host may be fetched now, or None when done."""
+        loop = asyncio.get_running_loop()
+        async with self.condition:
+            while True:
+                self._refill()
+                timeout = None
+                if self.ready_hosts:
+                    ready_time, _, host = self.ready_hosts[0]
+                    timeout = ready_time - loop.time()
+                    if timeout <= 0:
+                        heapq.heappop(self.ready_hosts)
+                        self.buffered -= 1
+                        self.in_flight += 1
+                        return host, self.host_queues[host].popleft()
+                elif not self.in_flight:
+                    # Nothing queued and no fetch left that could add links
+                    self.condition.notify_all()
+                    return None
+                try:
+                    await asyncio.wait_for(self.condition.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _worker(self):
+        while True:
+            next_url = await self._next_url()
+            if next_url is None:
+                return
+            host, url = next_url
+            try:
+                page = await self.fetcher.fetch(url)
+            except Exception:
+                # A DNS error or timeout fails this url, not the crawl
+                self.fetch_errors += 1
+                page = None
+            finally:
+                async with self.condition:
+                    next_fetch_time = asyncio.get_running_loop().time() + self.per_host_delay
+                    self.next_fetch_times[host] = next_fetch_time
+                    if self.host_queues[host]:
+                        self._schedule(host, next_fetch_time)
+                    else:
+                        self.scheduled_hosts.discard(host)
+                        del self.host_queues[host]
+                    self.condition.notify_all()
+            try:
+                await self._handle_page(url, page)
+            finally:
+                async with self.condition:
+                    self.in_flight -= 1
+                    self.pages_crawled += 1
+                    self.condition.notify_all()
+
+    async def _handle_page(self, url, page):
+        if page is None:
+            self.data_store.remove_link_to_crawl(url)
+            return
+        if self.data_store.crawled_similar(page.signature):
+            self.data_store.reduce_priority_link_to_crawl(page.url)
+            return
+        # Register the signature before any await, so a near-duplicate page
+        # handled by another worker meanwhile sees it
+        self.data_store.remove_link_to_crawl(page.url)
+        self.data_store.insert_crawled_link(page.url, page.signature)
+        for child_url in page.child_urls:
+            if self.seen_urls is None or self.seen_urls.add(child_url):
+                self.data_store.add_link_to_crawl(child_url)
+        for buffer in self.index_buffers:
+            await buffer.put(page)
+
+    async def _pump(self, buffer, index_queue):
+        """Feed buffered pages to an index queue until the None sentinel."""
+        while True:
+            page = await buffer.get()
+            if page is None:
+                return
+            try:
+                result = index_queue.generate(page)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                # Keep draining, or workers would block on the full buffer
+                self.index_errors += 1
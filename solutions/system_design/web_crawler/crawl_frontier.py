@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import tempfile
+
+
+class CrawlFrontier(object):
+    """Links to crawl, ordered by priority.
+
+    The hottest max_in_memory links live in an indexed max-heap: parallel
+    lists of urls and priorities plus a dict of each url's heap position,
+    so add, pop and changing the priority of a queued url are O(log n).
+
+    Once the heap grows past max_in_memory, its lowest priority
+    spill_fraction of links move to a SQLite segment on disk indexed by
+    priority.  Links come back in batches whenever the segment holds a
+    higher priority link than the heap, so pop always returns the overall
+    highest priority link.
+    """
+
+    def __init__(self, max_in_memory=1000000, spill_fraction=0.25, spill_path=None):
+        self.max_in_memory = max_in_memory
+        self.spill_size = max(1, int(max_in_memory * spill_fraction))
+        self.urls = []
+        self.priorities = []
+        self.positions = {}  # key: url, value: index in urls and priorities
+        self.owns_spill_path = spill_path is None
+        if spill_path is None:
+            fd, spill_path = tempfile.mkstemp(suffix='.frontier')
+            os.close(fd)
+        self.spill_path = spill_path
+        self.connection = sqlite3.connect(spill_path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS links (url TEXT PRIMARY KEY, priority REAL)')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS links_priority ON links (priority)')
+        self.num_spilled, self.spilled_max = self.connection.execute(
+            'SELECT COUNT(*), MAX(priority) FROM links').fetchone()
+
+    def __len__(self):
+        return len(self.urls) + self.num_spilled
+
+    def __contains__(self, url):
+        return url in self.positions or self._spilled_priority(url) is not None
+
+    def close(self):
+        self.connection.close()
+        if self.owns_spill_path:
+            os.remove(self.spill_path)
+
+    def priority(self, url):
+        """Return the priority of a queued url, or None if it isn't queued."""
+        index = self.positions.get(url)
+        if index is not None:
+            return self.priorities[index]
+        return self._spilled_priority(url)
+
+    def add(self, url, priority=0):
+        """Queue a url, or move it to the given priority if already queued."""
+        index = self.positions.get(url)
+        if index is not None:
+            self._update(index, priority)
+            return
+        if self.num_spilled and self._spilled_priority(url) is not None:
+            self._remove_spilled(url)
+        index = len(self.urls)
+        self.urls.append(url)
+        self.priorities.append(priority)
+        self.positions[url] = index
+        self._sift_up(index)
+        if len(self.urls) > self.max_in_memory:
+            self._spill()
+
+    def reduce_priority(self, url, amount=1):
+        """Lower the priority of a queued url by amount, if it is queued."""
+        priority = self.priority(url)
+        if priority is not None:
+            self.add(url, priority - amount)
+
+    def remove(self, url):
+        """Drop a url from the frontier, returning False if it wasn't queued."""
+        index = self.positions.get(url)
+        if index is None:
+            return self.num_spilled > 0 and self._remove_spilled(url)
+        self._remove_at(index)
+        return True
+
+    def pop(self):
+        """Remove and return the highest priority url, or None if empty."""
+        item = self.pop_item()
+        return None if item is None else item[0]
+
+    def pop_item(self):
+        """Remove and return the highest priority (url, priority), or None."""
+        if self.num_spilled and (not self.priorities or
+                                 self.spilled_max > self.priorities[0]):
+            self._load_spilled()
+        if not self.urls:
+            return None
+        item = self.urls[0], self.priorities[0]
+        self._remove_at(0)
+        return item
+
+    def _remove_at(self, index):
+        url = self.urls[index]
+        last = len(self.urls) - 1
+        if index != last:
+            self._swap(index, last)
+        self.urls.pop()
+        self.priorities.pop()
+        del self.positions[url]
+        if index != last:
+            self._sift_down(index)
+            self._sift_up(index)
+
+    def _update(self, index, priority):
+        old_priority = self.priorities[index]
+        self.priorities[index] = priority
+        if priority > old_priority:
+            self._sift_up(index)
+        elif priority < old_priority:
+            self._sift_down(index)
+
+    def _swap(self, i, j):
+        urls, priorities = self.urls, self.priorities
+        urls[i], urls[j] = urls[j], urls[i]
+        priorities[i], priorities[j] = priorities[j], priorities[i]
+        self.positions[urls[i]] = i
+        self.positions[urls[j]] = j
+
+    def _sift_up(self, index):
+        priorities = self.priorities
+        while index > 0:
+            parent = (index - 1) >> 1
+            if priorities[parent] >= priorities[index]:
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index):
+        priorities = self.priorities
+        size = len(priorities)
+        while True:
+            largest = index
+            left = 2 * index + 1
+            if left < size and priorities[left] > priorities[largest]:
+                largest = left
+            if left + 1 < size and priorities[left + 1] > priorities[largest]:
+                largest = left + 1
+            if largest == index:
+                return
+            self._swap(index, largest)
+            index = largest
+
+    def _heapify(self):
+        self.positions = {url: index for index, url in enumerate(self.urls)}
+        for index in reversed(range(len(self.urls) // 2)):
+            self._sift_down(index)
+
+    def _spill(self):
+        """Move the spill_size lowest priority links to the disk segment."""
+        order = sorted(range(len(self.urls)), key=self.priorities.__getitem__)
+        cold = set(order[:self.spill_size])
+        spilled = [(self.urls[i], self.priorities[i]) for i in cold]
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO links VALUES (?, ?)', spilled)
+        self.connection.commit()
+        self.num_spilled += len(spilled)
+        coldest_max = self.priorities[order[self.spill_size - 1]]
+        if self.spilled_max is None or coldest_max > self.spilled_max:
+            self.spilled_max = coldest_max
+        keep = [i for i in range(len(self.urls)) if i not in cold]
+        self.urls = [self.urls[i] for i in keep]
+        self.priorities = [self.priorities[i] for i in keep]
+        self._heapify()
+
+    def _load_spilled(self):
+        """Move the highest priority links on disk back into the heap."""
+        rows = self.connection.execute(
+            'SELECT url, priority FROM links ORDER BY priority DESC LIMIT ?',
+            (self.spill_size,)).fetchall()
+        self.connection.executemany(
+            'DELETE FROM links WHERE url = ?', [(url,) for url, _ in rows])
+        self.connection.commit()
+        self.num_spilled -= len(rows)
+        self.spilled_max = self.connection.execute(
+            'SELECT MAX(priority) FROM links').fetchone()[0]
+        for url, priority in rows:
+            self.urls.append(url)
+            self.priorities.append(priority)
+        if len(self.urls) > self.max_in_memory:
+            self._spill()
+        else:
+            self._heapify()
+
+    def _spilled_priority(self, url):
+        row = self.connection.execute(
+            'SELECT priority FROM links WHERE url = ?', (url,)).fetchone()
+        return None if row is None else row[0]
+
+    def _remove_spilled(self, url):
+        removed = self.connection.execute(
+            'DELETE FROM links WHERE url = ?', (url,)).rowcount
+        self.num_spilled -= removed
+        if not self.num_spilled:
+            self.spilled_max = None
+        return removed > 0
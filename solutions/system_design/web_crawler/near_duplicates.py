@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import re
+from collections import Counter
+
+import numpy as np
+
+WORD_RE = re.compile(r'\w+')
+BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH_32 = (1 << 32) - 1
+
+
+def shingles(text, size=4):
+    """Return a Counter of the lowercased word size-grams in text."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return Counter([' '.join(words)])
+    return Counter(' '.join(words[i:i + size])
+                   for i in range(len(words) - size + 1))
+
+
+def _shingle_hashes(counts):
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'),
+                                        digest_size=8).digest(), 'little')
+         for shingle in counts),
+        dtype=np.uint64, count=len(counts))
+    return hashes
+
+
+def simhash(text, shingle_size=4):
+    """Return a 64 bit SimHash of text's shingles, weighted by count.
+
+    Pages sharing most of their shingles get fingerprints differing in
+    only a few bits.
+    """
+    counts = shingles(text, shingle_size)
+    hashes = _shingle_hashes(counts)
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    bits = ((hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)).astype(np.int64)
+    totals = weights @ (2 * bits - 1)
+    return int(np.packbits(totals[::-1] > 0).view('>u8')[0])
+
+
+def hamming_distance(x, y):
+    return bin(x ^ y).count('1')
+
+
+class SimHashIndex(object):
+    """Find crawled fingerprints within max_distance bits of a new one.
+
+    Fingerprints are cut into max_distance + 1 bands, each with its own
+    table.  Two fingerprints differing in at most max_distance bits must
+    agree on at least one whole band, so a lookup only compares against
+    fingerprints sharing a band rather than every fingerprint crawled.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        num_bands = max_distance + 1
+        bounds = [64 * i // num_bands for i in range(num_bands + 1)]
+        self.bands = [(start, (1 << (end - start)) - 1)
+                      for start, end in zip(bounds, bounds[1:])]
+        self.tables = [{} for _ in self.bands]  # key: band value, value: [(fingerprint, key)]
+
+    def signature(self, text):
+        return simhash(text)
+
+    def add(self, fingerprint, key):
+        """Index fingerprint under key, which must not be None."""
+        for (shift, mask), table in zip(self.bands, self.tables):
+            table.setdefault((fingerprint >> shift) & mask, []).append((fingerprint, key))
+
+    def find_similar(self, fingerprint):
+        """Return the key of a fingerprint within max_distance bits, or None."""
+        for (shift, mask), table in zip(self.bands, self.tables):
+            for candidate, key in table.get((fingerprint >> shift) & mask, ()):
+                if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    return key
+        return None
+
+
+class MinHash(object):
+    """Signatures whose agreeing fraction estimates Jaccard similarity.
+
+    Each of num_perm universal hash functions (a * x + b) mod p keeps the
+    minimum over a page's shingle hashes.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=4, seed=1):
+        self.shingle_size = shingle_size
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = _shingle_hashes(shingles(text, self.shingle_size)) & np.uint64(MAX_HASH_32)
+        permuted = (hashes[:, None] * self.a + self.b) % np.uint64(MERSENNE_PRIME)
+        return tuple((permuted & np.uint64(MAX_HASH_32)).min(axis=0).tolist())
+
+
+def jaccard_estimate(x, y):
+    return sum(1 for i, j in zip(x, y) if i == j) / float(len(x))
+
+
+class MinHashLshIndex(object):
+    """Find crawled MinHash signatures with estimated Jaccard >= threshold.
+
+    Signatures are split into num_bands bands of rows_per_band values, one
+    table per band.  Pages with Jaccard similarity s share at least one
+    band with probability 1 - (1 - s ** rows_per_band) ** num_bands, so
+    similar pages almost always meet in some table while dissimilar ones
+    rarely do.
+    """
+
+    def __init__(self, num_bands=16, rows_per_band=8, threshold=0.8, shingle_size=4):
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.threshold = threshold
+        self.minhash = MinHash(num_bands * rows_per_band, shingle_size)
+        self.tables = [{} for _ in range(num_bands)]  # key: band, value: [(signature, key)]
+
+    def signature(self, text):
+        return self.minhash.signature(text)
+
+    def _bands(self, signature):
+        rows = self.rows_per_band
+        return (tuple(signature[i * rows:(i + 1) * rows]) for i in range(self.num_bands))
+
+    def add(self, signature, key):
+        """Index signature under key, which must not be None."""
+        for band, table in zip(self._bands(signature), self.tables):
+            table.setdefault(band, []).append((signature, key))
+
+    def find_similar(self, signature):
+        """Return the key of a signature estimated similar enough, or None."""
+        for band, table in zip(self._bands(signature), self.tables):
+            for candidate, key in table.get(band, ()):
+                if jaccard_estimate(signature, candidate) >= self.threshold:
+                    return key
+        return None
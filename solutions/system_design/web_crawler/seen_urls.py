@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import math
+import mmap
+import os
+import random
+import struct
+
+HEADER = struct.Struct('<8sQQQ')  # magic, size, parameter, count
+COUNT = struct.Struct('<Q')
+COUNT_OFFSET = HEADER.size - COUNT.size
+
+
+def _hash_pair(url):
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+class _MappedTable(object):
+    """A header followed by size_bytes of table, in memory or in a file.
+
+    Given a path the table is memory-mapped, so it persists across restarts
+    and is paged in lazily instead of being rebuilt.  The header is written
+    on creation and the count on every change, so a process that dies
+    without close() leaves a file that reopens with its true count.
+    """
+
+    def __init__(self, magic, size, parameter, size_bytes, path=None):
+        total = HEADER.size + size_bytes
+        self.path = path
+        self.header = (magic, size, parameter)
+        if path is None:
+            self.buffer = bytearray(total)
+            existing = 0
+        else:
+            with open(path, 'a+b') as f:
+                existing = os.path.getsize(path)
+                if existing not in (0, total):
+                    raise ValueError('{} does not match the table size'.format(path))
+                f.truncate(total)
+                self.buffer = mmap.mmap(f.fileno(), total)
+        if existing:
+            stored_magic, stored_size, stored_parameter, self._count = \
+                HEADER.unpack_from(self.buffer, 0)
+            if (stored_magic, stored_size, stored_parameter) != self.header:
+                raise ValueError('{} holds a different table'.format(path))
+        else:
+            self._count = 0
+            HEADER.pack_into(self.buffer, 0, *(self.header + (0,)))
+        self.table = memoryview(self.buffer)[HEADER.size:]
+
+    @property
+    def count(self):
+        return self._count
+
+    @count.setter
+    def count(self, count):
+        self._count = count
+        COUNT.pack_into(self.buffer, COUNT_OFFSET, count)
+
+    def flush(self):
+        if self.path is not None:
+            self.buffer.flush()
+
+    def close(self):
+        self.flush()
+        self.table.release()
+        if self.path is not None:
+            self.buffer.close()
+
+
+class BloomFilter(_MappedTable):
+    """Set membership with no false negatives and an error_rate of false
+    positives once capacity urls have been added."""
+
+    MAGIC = b'BLOOM001'
+
+    def __init__(self, capacity, error_rate=0.01, path=None):
+        self.capacity = capacity
+        self.num_bits = max(8, int(math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        super(BloomFilter, self).__init__(self.MAGIC, self.num_bits, self.num_hashes,
+                                          (self.num_bits + 7) // 8, path)
+
+    def _positions(self, url):
+        h1, h2 = _hash_pair(url)
+        num_bits = self.num_bits
+        position = h1 % num_bits
+        step = h2 % num_bits or 1
+        positions = [position]
+        for _ in range(self.num_hashes - 1):
+            position = (position + step) % num_bits
+            positions.append(position)
+        return positions
+
+    def __contains__(self, url):
+        table = self.table
+        for position in self._positions(url):
+            if not table[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, url):
+        """Add url, returning False if it was (probably) already present."""
+        table = self.table
+        added = False
+        for position in self._positions(url):
+            byte = table[position >> 3]
+            bit = 1 << (position & 7)
+            if not byte & bit:
+                table[position >> 3] = byte | bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+
+class ScalableBloomFilter(object):
+    """A Bloom filter that grows instead of degrading past its capacity.
+
+    When the newest filter reaches capacity, another growth times larger
+    is added with an error rate tightening times smaller, which bounds the
+    overall false positive rate by error_rate however many urls are added.
+    Given a directory, each filter is mapped from its own file there and
+    existing filters are reopened on startup.
+    """
+
+    def __init__(self, initial_capacity=1000000, error_rate=0.01, growth=2,
+                 tightening=0.5, directory=None):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.directory = directory
+        self.filters = []
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            while os.path.exists(self._path(len(self.filters))):
+                self._add_filter()
+        if not self.filters:
+            self._add_filter()
+
+    def _path(self, index):
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, 'seen-{:03d}.bloom'.format(index))
+
+    def _add_filter(self):
+        index = len(self.filters)
+        self.filters.append(BloomFilter(
+            self.initial_capacity * self.growth ** index,
+            self.error_rate * (1 - self.tightening) * self.tightening ** index,
+            self._path(index)))
+
+    def __len__(self):
+        return sum(bloom_filter.count for bloom_filter in self.filters)
+
+    def __contains__(self, url):
+        return any(url in bloom_filter for bloom_filter in self.filters)
+
+    def add(self, url):
+        """Add url, returning False if it was (probably) already present."""
+        if url in self:
+            return False
+        if self.filters[-1].count >= self.filters[-1].capacity:
+            self._add_filter()
+        return self.filters[-1].add(url)
+
+    def flush(self):
+        for bloom_filter in self.filters:
+            bloom_filter.flush()
+
+    def close(self):
+        for bloom_filter in self.filters:
+            bloom_filter.close()
+
+
+class CuckooFilter(_MappedTable):
+    """Set membership like a Bloom filter that also supports remove.
+
+    Stores a 16 bit fingerprint of each url in one of two buckets of
+    bucket_size slots; the second bucket is the first xor a hash of the
+    fingerprint, so an entry can be moved between its buckets knowing only
+    the fingerprint.  The false positive rate is about
+    2 * bucket_size / 2 ** 16.
+    """
+
+    MAGIC = b'CUCKOO01'
+
+    def __init__(self, capacity, bucket_size=4, max_kicks=500, path=None):
+        num_buckets = max(1, int(math.ceil(capacity / bucket_size / 0.95)))
+        self.num_buckets = 1 << (num_buckets - 1).bit_length()
+        self.bucket_size = bucket_size
+        self.max_kicks = max_kicks
+        self.random = random.Random(0)
+        super(CuckooFilter, self).__init__(self.MAGIC, self.num_buckets, bucket_size,
+                                           2 * self.num_buckets * bucket_size, path)
+        self.slots = self.table.cast('H')
+
+    def close(self):
+        self.slots.release()
+        super(CuckooFilter, self).close()
+
+    def __len__(self):
+        return self.count
+
+    def _locate(self, url):
+        h1, h2 = _hash_pair(url)
+        fingerprint = (h2 & 0xffff) or 1  # 0 marks an empty slot
+        index = h1 & (self.num_buckets - 1)
+        return fingerprint, index, self._alternate(index, fingerprint)
+
+    def _alternate(self, index, fingerprint):
+        return (index ^ (fingerprint * 0x5bd1e995)) & (self.num_buckets - 1)
+
+    def _find(self, index, fingerprint):
+        start = index * self.bucket_size
+        for slot in range(start, start + self.bucket_size):
+            if self.slots[slot] == fingerprint:
+                return slot
+        return None
+
+    def __contains__(self, url):
+        fingerprint, i1, i2 = self._locate(url)
+        return self._find(i1, fingerprint) is not None or \
+            self._find(i2, fingerprint) is not None
+
+    def add(self, url):
+        """Add url, returning False if it was (probably) already present.
+
+        Raises ValueError if the filter is too full to place it.
+        """
+        fingerprint, i1, i2 = self._locate(url)
+        if self._find(i1, fingerprint) is not None or \
+                self._find(i2, fingerprint) is not None:
+            return False
+        for index in (i1, i2):
+            slot = self._find(index, 0)
+            if slot is not None:
+                self.slots[slot] = fingerprint
+                self.count += 1
+                return True
+        # Both buckets are full, so evict entries to their other bucket
+        index = self.random.choice((i1, i2))
+        evicted = []
+        for _ in range(self.max_kicks):
+            slot = index * self.bucket_size + self.random.randrange(self.bucket_size)
+            evicted.append(slot)
+            fingerprint, self.slots[slot] = self.slots[slot], fingerprint
+            index = self._alternate(index, fingerprint)
+            empty = self._find(index, 0)
+            if empty is not None:
+                self.slots[empty] = fingerprint
+                self.count += 1
+                return True
+        # Undo the kicks so the filter is unchanged
+        for slot in reversed(evicted):
+            fingerprint, self.slots[slot] = self.slots[slot], fingerprint
+        raise ValueError('CuckooFilter is full')
+
+    def remove(self, url):
+        """Remove url, returning False if it wasn't present."""
+        fingerprint, i1, i2 = self._locate(url)
+        for index in (i1, i2):
+            slot = self._find(index, fingerprint)
+            if slot is not None:
+                self.slots[slot] = 0
+                self.count -= 1
+                return True
+        return False
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+
+RECORD_OVERHEAD = 41  # bytes object header plus its slot in the run list
+
+
+class ExternalUrlDeduplicator(object):
+    """Remove duplicate urls from files larger than memory on one machine.
+
+    Each url is prefixed with the hex of a fixed width blake2b digest,
+    digest_size 8 or 16 bytes, and buffered until memory_limit bytes are
+    held.  Buffers are sorted, deduplicated and written out as runs, and
+    the runs are merged, max_fan_in at a time, into one sorted stream
+    where copies of a url sit next to each other.  Sorting on the digest spreads urls
+    evenly and settles most comparisons in the first few bytes instead of
+    the long prefixes urls share.  Records compare digest and url, so a
+    digest collision never drops a different url.
+
+    Every url appearing at least once is emitted exactly once, in digest
+    order rather than input order.  Runs hold one url per line, so a url
+    containing a newline, which no valid url does, raises ValueError.
+    """
+
+    def __init__(self, memory_limit=256 * 2 ** 20, digest_size=8, max_fan_in=64,
+                 temp_dir=None):
+        self.memory_limit = memory_limit
+        self.digest_size = digest_size
+        self.max_fan_in = max_fan_in
+        self.temp_dir = temp_dir
+
+    def record(self, url):
+        if '\n' in url:
+            raise ValueError('url contains a newline: {!r}'.format(url))
+        encoded = url.encode('utf-8')
+        # Hex keeps newline bytes out of the digest, so runs split on lines
+        digest = hashlib.blake2b(encoded, digest_size=self.digest_size).hexdigest()
+        return digest.encode('ascii') + encoded + b'\n'
+
+    def unique_urls(self, urls):
+        """Yield each distinct url from an iterable of urls once."""
+        work_dir = tempfile.mkdtemp(prefix='url-dedup-', dir=self.temp_dir)
+        try:
+            runs = self._write_runs(urls, work_dir)
+            while len(runs) > self.max_fan_in:
+                runs = [self._merge_to_run(runs[i:i + self.max_fan_in], work_dir)
+                        for i in range(0, len(runs), self.max_fan_in)]
+            files = [open(path, 'rb') for path in runs]
+            try:
+                digest_width = 2 * self.digest_size
+                for record in _unique(heapq.merge(*files)):
+                    yield record[digest_width:-1].decode('utf-8')
+            finally:
+                for run_file in files:
+                    run_file.close()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def unique_urls_in_files(self, paths):
+        """Yield each distinct url across files of one url per line once."""
+        return self.unique_urls(_read_urls(paths))
+
+    def _write_runs(self, urls, work_dir):
+        runs = []
+        records = []
+        buffered = 0
+        for url in urls:
+            record = self.record(url)
+            records.append(record)
+            buffered += len(record) + RECORD_OVERHEAD
+            if buffered >= self.memory_limit:
+                runs.append(self._write_run(records, work_dir, len(runs)))
+                records = []
+                buffered = 0
+        if records or not runs:
+            runs.append(self._write_run(records, work_dir, len(runs)))
+        return runs
+
+    def _write_run(self, records, work_dir, number):
+        records.sort()
+        path = os.path.join(work_dir, 'run-{}'.format(number))
+        with open(path, 'wb') as run_file:
+            run_file.writelines(_unique(records))
+        return path
+
+    def _merge_to_run(self, runs, work_dir):
+        fd, path = tempfile.mkstemp(prefix='merged-', dir=work_dir)
+        files = [open(run, 'rb') for run in runs]
+        try:
+            with os.fdopen(fd, 'wb') as run_file:
+                run_file.writelines(_unique(heapq.merge(*files)))
+        finally:
+            for run_file in files:
+                run_file.close()
+        for run in runs:
+            os.remove(run)
+        return path
+
+
+def _unique(sorted_records):
+    previous = None
+    for record in sorted_records:
+        if record != previous:
+            yield record
+            previous = record
+
+
+def _read_urls(paths):
+    for path in paths:
+        with open(path, encoding='utf-8') as url_file:
+            for line in url_file:
+                url = line.strip()
+                if url:
+                    yield url
+
+
+def main(*paths):
+    """Write the distinct urls in the given files to stdout."""
+    deduplicator = ExternalUrlDeduplicator()
+    sys.stdout.writelines(url + '\n' for url in deduplicator.unique_urls_in_files(paths))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
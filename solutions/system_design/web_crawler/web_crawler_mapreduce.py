@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from mrjob.job import MRJob
+from mrjob.step import MRStep
 
 
 class RemoveDuplicateUrls(MRJob):
@@ -9,15 +10,13 @@ class RemoveDuplicateUrls(MRJob):
         yield line, 1
 
     def reducer(self, key, values):
-        total = sum(values)
-        if total == 1:
-            yield key, total
+        yield key, sum(values)
 
     def steps(self):
         """Run the map and reduce steps."""
         return [
-            self.mr(mapper=self.mapper,
-                    reducer=self.reducer)
+            MRStep(mapper=self.mapper,
+                   reducer=self.reducer)
         ]
 
 
@@ -1,60 +1,102 @@
 # -*- coding: utf-8 -*-
 
+from .crawl_frontier import CrawlFrontier
+from .near_duplicates import SimHashIndex, simhash
+
+
 class PagesDataStore(object):
 
-    def __init__(self, db):
+    def __init__(self, db, frontier=None, signature_index=None, max_priority_reductions=3):
         self.db = db
-        pass
-
-    def add_link_to_crawl(self, url):
-        """Add the given link to `links_to_crawl`."""
-        pass
+        self.frontier = frontier if frontier is not None else CrawlFrontier()
+        self.signature_index = signature_index if signature_index is not None \
+            else SimHashIndex()
+        self.max_priority_reductions = max_priority_reductions
+        self.extracted = {}  # key: url being crawled, value: its priority
+        self.reductions = {}  # key: url, value: times its priority was reduced
+        self.crawled_links = {}  # key: url, value: signature
+
+    def add_link_to_crawl(self, url, priority=0):
+        """Add the given link to `links_to_crawl` unless it was crawled or
+        is being crawled."""
+        if url not in self.crawled_links and url not in self.extracted:
+            self.frontier.add(url, priority)
 
     def remove_link_to_crawl(self, url):
         """Remove the given link from `links_to_crawl`."""
-        pass
+        self.frontier.remove(url)
+        self.extracted.pop(url, None)
+        self.reductions.pop(url, None)
 
     def reduce_priority_link_to_crawl(self, url):
-        """Reduce the priority of a link in `links_to_crawl` to avoid cycles."""
-        pass
+        """Reduce the priority of a link in `links_to_crawl` to avoid cycles.
+
+        An extracted link goes back one priority lower.  After
+        max_priority_reductions reductions the link is dropped, so a page
+        that keeps matching a crawled one can't cycle forever.
+        """
+        reductions = self.reductions.get(url, 0) + 1
+        if reductions > self.max_priority_reductions:
+            self.remove_link_to_crawl(url)
+            return
+        self.reductions[url] = reductions
+        priority = self.extracted.pop(url, None)
+        if priority is None:
+            self.frontier.reduce_priority(url)
+        else:
+            self.frontier.add(url, priority - 1)
 
     def extract_max_priority_page(self):
-        """Return the highest priority link in `links_to_crawl`."""
-        pass
+        """Remove and return the url of the highest priority link in
+        `links_to_crawl`, or None once it is empty."""
+        item = self.frontier.pop_item()
+        if item is None:
+            return None
+        url, priority = item
+        self.extracted[url] = priority
+        return url
 
     def insert_crawled_link(self, url, signature):
         """Add the given link to `crawled_links`."""
-        pass
+        self.crawled_links[url] = signature
+        self.signature_index.add(signature, url)
 
     def crawled_similar(self, signature):
         """Determine if we've already crawled a page matching the given signature"""
-        pass
+        return self.signature_index.find_similar(signature) is not None
 
 
 class Page(object):
 
-    def __init__(self, url, contents, child_urls):
+    def __init__(self, url, contents, child_urls, signer=simhash):
         self.url = url
         self.contents = contents
         self.child_urls = child_urls
+        self.signer = signer
         self.signature = self.create_signature()
 
     def create_signature(self):
-        # Create signature based on url and contents
-        pass
+        # Near-duplicate pages get similar signatures, SimHash by default or
+        # pass signer=MinHashLshIndex().signature to match that index
+        return self.signer(self.contents)
 
 
 class Crawler(object):
 
-    def __init__(self, pages, data_store, reverse_index_queue, doc_index_queue):
+    def __init__(self, pages, data_store, reverse_index_queue, doc_index_queue,
+                 seen_urls=None):
         self.pages = pages
         self.data_store = data_store
         self.reverse_index_queue = reverse_index_queue
         self.doc_index_queue = doc_index_queue
+        # Optional ScalableBloomFilter or CuckooFilter from seen_urls, skips
+        # the data store round trip for links already discovered
+        self.seen_urls = seen_urls
 
     def crawl_page(self, page):
         for url in page.child_urls:
-            self.data_store.add_link_to_crawl(url)
+            if self.seen_urls is None or self.seen_urls.add(url):
+                self.data_store.add_link_to_crawl(url)
         self.reverse_index_queue.generate(page)
         self.doc_index_queue.generate(page)
         self.data_store.remove_link_to_crawl(page.url)
@@ -62,11 +104,13 @@ class Crawler(object):
 
     def crawl(self):
         while True:
-            page = self.data_store.extract_max_priority_page()
-            if page is None:
+            url = self.data_store.extract_max_priority_page()
+            if url is None:
                 break
-            if self.data_store.crawled_similar(page.signature):
+            page = self.pages.get(url)  # key: url, value: fetched Page
+            if page is None:
+                self.data_store.remove_link_to_crawl(url)
+            elif self.data_store.crawled_similar(page.signature):
                 self.data_store.reduce_priority_link_to_crawl(page.url)
             else:
                 self.crawl_page(page)
-            page = self.data_store.extract_max_priority_page()